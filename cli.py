@@ -0,0 +1,64 @@
+import argparse
+
+import json
+
+import sys
+
+from utils import OneRingDB, ORQueryExecutor
+
+# Exécution de scripts ORQL sans interface :
+#   python cli.py script.orql --base base.ordb --save base.ordb
+
+def load_base(path:str=None)->OneRingDB:
+    """Instantané écrit par save_snapshot, corpus JSON ou JSON Lines, ou base vide sans chemin."""
+    if path is None:
+        return OneRingDB()
+    if path.endswith((".json", ".jsonl", ".ndjson")):
+        base = OneRingDB()
+        base.stream_load_file(path)
+        return base
+    return OneRingDB.open_snapshot(path)
+
+def print_result(result, as_json:bool=False):
+    if as_json:
+        print(json.dumps(result.to_dict(), ensure_ascii=False, default=str))
+        return
+    print(f"> {result.Line} ({result.Elapsed * 1000:.3f} ms)")
+    if result.Message:
+        print(result.Message, file=sys.stderr if result.Status == "error" else sys.stdout)
+    if type(result.Value) is dict:
+        for k, v in result.Value.items():
+            print(k)
+            for item in (v if type(v) is list else [v]):
+                print(f"  {item}")
+
+def main(argv=None)->int:
+    parser = argparse.ArgumentParser(description="Exécutez des scripts ORQL sur une base OneRingDB.")
+    parser.add_argument("scripts", nargs="+", help="fichiers .orql, exécutés dans l'ordre")
+    parser.add_argument("-b", "--base", help="instantané (save_snapshot) ou corpus .json/.jsonl à charger ; base vide par défaut")
+    parser.add_argument("-s", "--save", help="enregistrer la base dans cet instantané après les scripts")
+    parser.add_argument("--json", action="store_true", help="un objet JSON par ligne exécutée")
+    parser.add_argument("--ignore-direction", action="store_true", help="ignorer le sens des arêtes pour LINK")
+    args = parser.parse_args(argv)
+
+    base = load_base(args.base)
+    executor = ORQueryExecutor()
+    for script in args.scripts:
+        try:
+            with open(script, encoding="utf-8") as f:
+                executor.Cleand_query = executor.clean_query(f.read())
+            results = executor.execute_queries(base, args.ignore_direction)
+        except (OSError, SyntaxError, ValueError, KeyError) as error:
+            print(f"{script} : {error}", file=sys.stderr)
+            return 1
+        # Les lignes exécutées avant une erreur sont affichées : elles ont déjà modifié la base
+        for result in results:
+            print_result(result, args.json)
+        if results and results[-1].Status == "error":
+            return 1
+    if args.save:
+        base.save_snapshot(args.save)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,6 @@
 import streamlit as st
 
 import re
-import json
 from collections import defaultdict
 
 import networkx as nx
@@ -31,6 +30,21 @@ def greedy_coloring(graph):
 
     return color_assignment
 
+def display_results(results):
+    # affichage des ORResult retournés par le moteur
+    for result in results:
+        if result.Message:
+            if result.Status == "error":
+                st.error(result.Message)
+            elif result.Status == "warning":
+                st.warning(result.Message)
+            else:
+                st.success(result.Message)
+        if type(result.Value) is dict:
+            st.session_state.return_object = result.Value
+            for k, v in result.Value.items():
+                st.write(k, v)
+
 def draw_graph(base: OneRingDB):
     G = nx.Graph()
 
@@ -112,7 +126,7 @@ if 'LINEARISE' not in st.session_state:
 
 # sidebar
 st.sidebar.header("Interroger la base")
-uploaded_file = st.sidebar.file_uploader("Charger un fichier JSON", type="json")
+uploaded_file = st.sidebar.file_uploader("Charger un fichier JSON", type=["json", "jsonl", "ndjson"])
 
 query_input = st.sidebar.text_area("Entrez une requête ORQL", height=200)
 ignore_direction = st.sidebar.checkbox("Ignore Direction", value=False)
@@ -125,35 +139,25 @@ if 'uploaded_file' not in st.session_state:
 
 if uploaded_file and st.session_state.uploaded_file != uploaded_file:
     st.session_state.uploaded_file = uploaded_file
-    content = json.load(uploaded_file)
-    nodes = content.get("nodes", {})
-    relationships = content.get("relationships", [])
-
     st.session_state.base = OneRingDB()
     st.session_state.CLUSTER = False
     st.session_state.COLOR = False
     st.session_state.LINEARISE = False
-    for node_name, class_name in nodes.items():
-        st.session_state.base.create_node(node_name, class_name)
-
-    for source_name, target_name, edge_class, edge_properties in relationships:
-        st.session_state.base.create_edge(
-            st.session_state.base.get_node_by_name(source_name).Id,
-            st.session_state.base.get_node_by_name(target_name).Id,
-            edge_class,
-            edge_properties
-        )
+    # Lecture en flux : le fichier n'est jamais matérialisé entièrement en objets Python
+    st.session_state.base.stream_load(uploaded_file, json_lines=uploaded_file.name.endswith((".jsonl", ".ndjson")))
     st.success("✅ Base de données chargée !")
 
 if 'base' in st.session_state:
     # run ORQL query
     if run_query and query_input.strip():
         start_time = time.time()
-        ORQueryExecutor(query_input, st.session_state.base, ignore_direction=ignore_direction)
+        executor = ORQueryExecutor(query_input, st.session_state.base, ignore_direction=ignore_direction, session=st.session_state)
+        display_results(executor.Results)
         end_time = time.time()
         elapsed_time = end_time - start_time
 
-        st.success(f"✅ Requête exécutée en {elapsed_time:.3f} secondes.")
+        if not executor.Results or executor.Results[-1].Status != "error":
+            st.success(f"✅ Requête exécutée en {elapsed_time:.3f} secondes.")
 
     base = st.session_state.base
     st.subheader("Statistiques")
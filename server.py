@@ -0,0 +1,162 @@
+import argparse
+
+import asyncio
+
+import json
+
+import threading
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from contextlib import contextmanager
+
+from utils import OneRingDB, ORQueryExecutor
+
+from cli import load_base
+
+# Serveur ORQL local : une requête par ligne, en JSON {"query": "...", "ignore_direction": false} ou en ORQL brut,
+# et une réponse JSON par ligne. Exemple : python server.py --base lotr.ordb --port 7687
+
+# Commandes qui ne modifient pas la base et s'exécutent en parallèle sous le verrou de lecture. Les caches qu'elles
+# remplissent à la demande (instantané CSR, poids, index des préfixes) sont publiés d'une seule affectation ou sous verrou.
+READ_COMMANDS = ('READ', 'COUNT', 'TOP', 'DEGREE', 'MATCH', 'LINK', 'CLUSTER', 'COLOR', 'LINEARISE')
+
+class ORReadWriteLock:
+    """Verrou lecteurs-rédacteur : plusieurs lecteurs à la fois ou un seul rédacteur. Un rédacteur en attente
+    bloque les nouveaux lecteurs, sinon un flux continu de lectures l'empêcherait d'écrire."""
+    def __init__(self):
+        self.Condition = threading.Condition()
+        self.Readers = 0
+        self.Writing = False
+        self.Waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        with self.Condition:
+            while self.Writing or self.Waiting_writers:
+                self.Condition.wait()
+            self.Readers += 1
+        try:
+            yield
+        finally:
+            with self.Condition:
+                self.Readers -= 1
+                if not self.Readers:
+                    self.Condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self.Condition:
+            self.Waiting_writers += 1
+            while self.Writing or self.Readers:
+                self.Condition.wait()
+            self.Waiting_writers -= 1
+            self.Writing = True
+        try:
+            yield
+        finally:
+            with self.Condition:
+                self.Writing = False
+                self.Condition.notify_all()
+
+class ORServer:
+    def __init__(self, base:OneRingDB, threads:int=8, path_workers:int=None):
+        """Les requêtes s'exécutent dans un pool de `threads` fils ; les LINK ALL sont confiés à un pool de
+        `path_workers` processus (nombre de cœurs par défaut, 0 pour les calculer dans le fil de la requête)."""
+        self.Base = base
+        self.Lock = ORReadWriteLock()
+        self.Threads = ThreadPoolExecutor(threads)
+        self.Path_pool = ProcessPoolExecutor(path_workers) if path_workers != 0 else None
+
+    @staticmethod
+    def is_read_only(executor:ORQueryExecutor)->bool:
+        """Vraie si aucune ligne ne modifie la base. EXPLAIN n'exécute rien ; PROFILE exécute la requête qui suit."""
+        plans = [executor.Plan_cache.get(line) for line in executor.Cleand_query]
+        return all(plan.Explain == "EXPLAIN" or plan.Command.startswith(READ_COMMANDS) for plan in plans)
+
+    def execute(self, executor:ORQueryExecutor, request:dict)->dict:
+        """Exécutez un script sous le verrou qui convient, dans un fil du pool. Un script est exécuté en entier :
+        une transaction BEGIN ... COMMIT ne peut pas s'étendre sur plusieurs requêtes."""
+        try:
+            executor.Cleand_query = executor.clean_query(request["query"])
+            lock = self.Lock.read if self.is_read_only(executor) else self.Lock.write
+            with lock():
+                results = executor.execute_queries(self.Base, request.get("ignore_direction", False))
+            response = {"ok": True, "results": [result.to_dict() for result in results]}
+            # Une erreur d'exécution arrête le script ; les lignes qui la précèdent restent dans les résultats
+            if results and results[-1].Status == "error":
+                response["ok"], response["error"] = False, results[-1].Message
+            return response
+        except Exception as error:
+            return {"ok": False, "error": f"{type(error).__name__} : {error}"}
+
+    @staticmethod
+    def parse_request(line:bytes)->dict:
+        text = line.decode("utf-8").strip()
+        if text.startswith("{"):
+            return json.loads(text)
+        return {"query": text}
+
+    async def handle(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter):
+        """Une connexion : ses requêtes sont exécutées dans l'ordre, avec ses propres options d'affichage."""
+        executor = ORQueryExecutor()
+        executor.Path_pool = self.Path_pool
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    request = self.parse_request(line)
+                except (UnicodeDecodeError, json.JSONDecodeError) as error:
+                    response = {"ok": False, "error": f"Requête illisible : {error}"}
+                else:
+                    response = await loop.run_in_executor(self.Threads, self.execute, executor, request)
+                writer.write(json.dumps(response, ensure_ascii=False, default=str).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            # Client parti pendant la réponse : il n'y a plus personne à qui répondre
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def serve(self, host:str="127.0.0.1", port:int=7687, unix_path:str=None):
+        if unix_path is not None:
+            server = await asyncio.start_unix_server(self.handle, unix_path, limit=1 << 24)
+        else:
+            server = await asyncio.start_server(self.handle, host, port, limit=1 << 24)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.Threads.shutdown()
+        if self.Path_pool is not None:
+            self.Path_pool.shutdown()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servez une base OneRingDB en ORQL sur un port TCP local ou une socket Unix.")
+    parser.add_argument("-b", "--base", help="instantané (save_snapshot) ou corpus .json/.jsonl à charger ; base vide par défaut")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7687)
+    parser.add_argument("--unix", help="chemin d'une socket Unix, à la place du port TCP")
+    parser.add_argument("--threads", type=int, default=8, help="requêtes exécutées en même temps")
+    parser.add_argument("--path-workers", type=int, default=None, help="processus pour LINK ALL (0 : aucun)")
+    args = parser.parse_args(argv)
+
+    server = ORServer(load_base(args.base), args.threads, args.path_workers)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+if __name__ == "__main__":
+    main()
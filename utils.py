@@ -1,71 +1,1148 @@
 # Import =========================================================================================================
 import uuid
 
+import os
+
+import copy
+
+import sys
+
+import json
+
+import io
+
+import mmap
+
+import struct
+
+import heapq
+
 import logging
 
-from collections import defaultdict
+from collections import defaultdict, OrderedDict, Counter
+
+from itertools import chain, islice
+
+from array import array
+
+from time import perf_counter
 
 from typing import List, Dict, Tuple
 
+from bisect import bisect_left
+
 import re
 
-import streamlit as st
+import threading
 
 # Fonctions =========================================================================================================
 logger = logging.getLogger("MyLogger")
 logger.setLevel(logging.INFO)
+if not logger.handlers:
+    logger.addHandler(logging.StreamHandler())
 
 class Node:
-    def __init__(self, name:str, node_class:str=None, properties:dict=None):
+    __slots__ = ("Name", "Node_class", "Properties", "Id", "Neighbours", "Out_edges", "In_edges", "HUB")
+    def __init__(self, name:str, node_class:str=None, properties:dict=None, node_id=None):
         self.Name = name
         self.Node_class = node_class if node_class else "default"
         self.Properties = properties if properties else {}
-        self.Id = self.generate_id()
+        # En mode compact, l'Id est un entier dense attribué par OneRingDB
+        self.Id = node_id if node_id is not None else self.generate_id()
         self.Neighbours = set()
+        # Ids des arêtes sortantes et entrantes
+        self.Out_edges = set()
+        self.In_edges = set()
         self.HUB = False
     def generate_id(self)->str:
         return f"{self.Node_class}:{self.Name}:{uuid.uuid4()}"
+    @property
+    def External_id(self)->str:
+        """Id lisible par un humain, y compris en mode compact."""
+        if isinstance(self.Id, str):
+            return self.Id
+        return f"{self.Node_class}:{self.Name}:{self.Id}"
     def add_neighbour(self, neighbour_id:str):
         self.Neighbours.add(neighbour_id)
     def remove_neighbour(self, neighbour_id):
         self.Neighbours.discard(neighbour_id)
+    def get_degree(self)->int:
+        return len(self.Out_edges) + len(self.In_edges)
     def __str__(self)->str:
         return f"Node(name={self.Name}, class={self.Node_class}, id={self.Id}, neighbours={list(self.Neighbours)})"
     
 class Edge:
-    def __init__(self, source_id:str, target_id:str, node_class:str=None, properties:dict=None):
+    __slots__ = ("Source_id", "Target_id", "Edge_class", "Properties", "Id")
+    def __init__(self, source_id:str, target_id:str, node_class:str=None, properties:dict=None, edge_id=None):
         self.Source_id = source_id
         self.Target_id = target_id
         self.Edge_class = node_class if node_class else "default"
         self.Properties = properties if properties else {}
-        self.Id = self.generate_id()
+        self.Id = edge_id if edge_id is not None else self.generate_id()
     def generate_id(self)->str:
         return f"{self.Source_id}->{self.Target_id}:{uuid.uuid4()}"    
+    @property
+    def External_id(self)->str:
+        """Id lisible par un humain, y compris en mode compact."""
+        if isinstance(self.Id, str):
+            return self.Id
+        return f"{self.Source_id}->{self.Target_id}:{self.Id}"
     def __str__(self)->str:
         return f"Edge(source={self.Source_id}, target={self.Target_id}, class={self.Edge_class}, id={self.Id})"
 
-class OneRingDB:
+class OrderedIds(dict):
+    """Ensemble d'ids qui garde l'ordre d'insertion (les clés d'un dictionnaire) : les entrées des index de classes et
+    de propriétés sont ainsi lues dans l'ordre de création des éléments, et non dans l'ordre des hachages."""
+    __slots__ = ()
+    def add(self, element_id):
+        self[element_id] = None
+    def discard(self, element_id):
+        self.pop(element_id, None)
+    def __ior__(self, element_ids):
+        for element_id in element_ids:
+            self[element_id] = None
+        return self
+    def __isub__(self, element_ids):
+        for element_id in element_ids:
+            self.pop(element_id, None)
+        return self
+
+class NamePrefixIndex:
+    """Tableau trié des noms distincts pour la recherche par préfixe en O(log N + k).
+    Les ajouts et les suppressions sont mis en attente puis fusionnés à la recherche suivante."""
     def __init__(self):
+        self.Sorted_names:List[str] = []
+        self.Pending_names = set()
+        self.Removed_names = set()
+        # Des recherches concurrentes (serveur, sous le verrou de lecture) peuvent déclencher la même fusion
+        self.Lock = threading.Lock()
+    def add(self, name:str):
+        if name in self.Removed_names:
+            self.Removed_names.discard(name)
+        else:
+            self.Pending_names.add(name)
+    def remove(self, name:str):
+        if name in self.Pending_names:
+            self.Pending_names.discard(name)
+        else:
+            self.Removed_names.add(name)
+    def _merge(self)->List[str]:
+        """Le tableau fusionné est construit à part puis publié d'une seule affectation : une recherche en cours garde
+        l'ancien, qui reste trié."""
+        if self.Removed_names or self.Pending_names:
+            with self.Lock:
+                names = self.Sorted_names
+                if self.Removed_names:
+                    names = [name for name in names if name not in self.Removed_names]
+                if self.Pending_names:
+                    # Deux séquences déjà triées : le tri de Python les fusionne en temps linéaire
+                    names = names + sorted(self.Pending_names)
+                    names.sort()
+                self.Sorted_names = names
+                self.Removed_names.clear()
+                self.Pending_names.clear()
+        return self.Sorted_names
+    def startswith(self, prefix:str)->List[str]:
+        sorted_names = self._merge()
+        names = []
+        for idx in range(bisect_left(sorted_names, prefix), len(sorted_names)):
+            name = sorted_names[idx]
+            if not name.startswith(prefix):
+                break
+            names.append(name)
+        return names
+
+class JSONStreamReader:
+    """Lecteur JSON incrémental : seuls un tampon de lecture et la valeur en cours de décodage sont en mémoire."""
+    def __init__(self, stream, chunk_size:int=1 << 20):
+        # Les flux binaires (fichiers ouverts en 'rb', téléversements Streamlit) sont décodés en UTF-8
+        if isinstance(stream.read(0), bytes):
+            stream = io.TextIOWrapper(stream, encoding="utf-8")
+        self.Stream = stream
+        self.Chunk_size = chunk_size
+        self.Buffer = ""
+        self.Position = 0
+        self.Eof = False
+        self.Decoder = json.JSONDecoder()
+
+    def _fill(self)->bool:
+        chunk = self.Stream.read(self.Chunk_size)
+        if not chunk:
+            self.Eof = True
+            return False
+        self.Buffer = self.Buffer[self.Position:] + chunk
+        self.Position = 0
+        return True
+
+    def peek(self)->str:
+        """Retournez le prochain caractère significatif sans le consommer ('' en fin de flux)."""
+        while True:
+            while self.Position < len(self.Buffer) and self.Buffer[self.Position] in " \t\r\n":
+                self.Position += 1
+            if self.Position < len(self.Buffer) or not self._fill():
+                return self.Buffer[self.Position:self.Position + 1]
+
+    def expect(self, char:str):
+        if self.peek() != char:
+            raise ValueError(f"JSON invalide : '{char}' attendu à la place de '{self.peek()}'.")
+        self.Position += 1
+
+    def decode_value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.Decoder.raw_decode(self.Buffer, self.Position)
+                # Un nombre en fin de tampon peut être tronqué : on relit avant de conclure
+                if end < len(self.Buffer) or self.Eof or not self._fill():
+                    self.Position = end
+                    return value
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+
+    def iter_object(self):
+        """Itérez sur les paires (clé, valeur) d'un objet dont l'accolade ouvrante a été consommée."""
+        if self.peek() == "}":
+            self.Position += 1
+            return
+        while True:
+            key = self.decode_value()
+            self.expect(":")
+            yield key, self.decode_value()
+            if self.peek() == ",":
+                self.Position += 1
+            else:
+                self.expect("}")
+                return
+
+    def iter_array(self):
+        """Itérez sur les éléments d'un tableau dont le crochet ouvrant a été consommé."""
+        if self.peek() == "]":
+            self.Position += 1
+            return
+        while True:
+            yield self.decode_value()
+            if self.peek() == ",":
+                self.Position += 1
+            else:
+                self.expect("]")
+                return
+
+class ORPlanStep:
+    """Opérateur d'un plan d'exécution. Estimated_rows vient des tailles des index avant l'exécution ;
+    Rows et Time (secondes, enfants compris) ne sont remplis que par PROFILE."""
+    __slots__ = ("Operator", "Detail", "Estimated_rows", "Children", "Ids", "Args", "Rows", "Time")
+
+    def __init__(self, operator:str, detail:str="", estimated_rows:int=0, children:list=None, ids=None, args=None):
+        self.Operator = operator
+        self.Detail = detail
+        self.Estimated_rows = estimated_rows
+        self.Children:List["ORPlanStep"] = children if children is not None else []
+        # Ensemble d'ids lu par une feuille (IndexSeek, ClassScan)
+        self.Ids = ids
+        # Paramètres lus à l'exécution par l'opérateur (positions d'un Expand de MATCH)
+        self.Args = args
+        self.Rows = None
+        self.Time = None
+
+    def track(self, iterator):
+        """Relayez `iterator` en comptant les lignes produites et le temps passé à les produire (enfants compris)."""
+        self.Rows, self.Time = 0, 0.0
+        iterator = iter(iterator)
+        while True:
+            started = perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.Time += perf_counter() - started
+                return
+            self.Time += perf_counter() - started
+            self.Rows += 1
+            yield item
+
+    def describe(self, depth:int=0)->List[str]:
+        """Retournez le plan sous forme de lignes indentées."""
+        line = "  " * depth + self.Operator
+        if self.Detail:
+            line += f"({self.Detail})"
+        line += f" ≈ {self.Estimated_rows} lignes"
+        if self.Rows is not None:
+            line += f" | réel : {self.Rows} lignes"
+        if self.Time is not None:
+            line += f" en {self.Time * 1000:.3f} ms"
+        lines = [line]
+        for child in self.Children:
+            lines += child.describe(depth + 1)
+        return lines
+
+class CSRSnapshot:
+    """Instantané en lecture seule du graphe au format CSR (compressed sparse row), dans les deux directions.
+    Les nœuds sont numérotés de 0 à N-1 ; pour le nœud i, ses voisins sortants sont
+    Out_targets[Out_offsets[i]:Out_offsets[i+1]] et les codes de classe des arêtes correspondantes sont
+    dans Out_classes. Les tableaux In_* décrivent les arêtes entrantes de la même façon."""
+    def __init__(self, base:"OneRingDB"):
+        self.Version = base.TopologyVersion
+        self.Node_ids = list(base.NodeDictionary)
+        self.Node_index = {node_id:idx for idx, node_id in enumerate(self.Node_ids)}
+        # Codes entiers des classes de nœuds et d'arêtes
+        self.Node_class_codes:Dict[str:int] = {}
+        self.Edge_class_codes:Dict[str:int] = {}
+        self.Node_classes = array('i', (self._code(self.Node_class_codes, node.Node_class) for node in base.NodeDictionary.values()))
+        edges = list(base.EdgeDictionary.values())
+        # Out_edges et In_edges contiennent des indices dans Edge_ids
+        self.Edge_ids = [edge.Id for edge in edges]
+        sources = array('i', (self.Node_index[edge.Source_id] for edge in edges))
+        targets = array('i', (self.Node_index[edge.Target_id] for edge in edges))
+        classes = array('i', (self._code(self.Edge_class_codes, edge.Edge_class) for edge in edges))
+        self.Out_offsets, self.Out_targets, self.Out_classes, self.Out_edges = self._build(sources, targets, classes)
+        self.In_offsets, self.In_targets, self.In_classes, self.In_edges = self._build(targets, sources, classes)
+        # Identifie les tableaux CSR, qui ne changent pas jusqu'à la reconstruction (voir _find_all_paths_in_worker)
+        self.Token = uuid.uuid4().hex
+        self._reset_changes()
+
+    def _reset_changes(self):
+        # Modifications appliquées en place depuis la construction, sans toucher aux tableaux CSR :
+        # arêtes ajoutées (position dans Edge_ids -> (source, cible, code de classe)) et leurs positions par nœud,
+        # positions des arêtes retirées et codes de classe des nœuds ajoutés ou modifiés
+        self.Added_edges:Dict[int, Tuple[int, int, int]] = {}
+        self.Added_out:Dict[int, List[int]] = defaultdict(list)
+        self.Added_in:Dict[int, List[int]] = defaultdict(list)
+        self.Removed_edges = set()
+        self.Changed_node_classes:Dict[int, int] = {}
+        self.Nb_changes = 0
+        # Id d'arête -> position dans Edge_ids, construit à la première suppression
+        self.Edge_position:dict = None
+        # Propriété -> poids des arêtes par position dans Edge_ids (voir edge_weights)
+        self.Weights:Dict[str, array] = {}
+    # Attributs des modifications en place, envoyés avec BUFFERS aux processus du pool de chemins
+    CHANGES = ('Added_edges', 'Added_out', 'Added_in', 'Removed_edges', 'Changed_node_classes', 'Nb_changes')
+
+    @classmethod
+    def from_buffers(cls, version:int, node_ids:list, edge_ids:list, node_class_names:List[str], edge_class_names:List[str], buffers:dict, changes:dict=None)->"CSRSnapshot":
+        """Reconstruisez un instantané à partir de tableaux existants (par exemple des memoryview d'un fichier mmap), sans copie,
+        et éventuellement des modifications en place d'un autre instantané (voir CHANGES)."""
+        graph = cls.__new__(cls)
+        graph.Version = version
+        graph.Node_ids = node_ids
+        graph.Node_index = {node_id:idx for idx, node_id in enumerate(node_ids)}
+        graph.Edge_ids = edge_ids
+        graph.Node_class_codes = {name:code for code, name in enumerate(node_class_names)}
+        graph.Edge_class_codes = {name:code for code, name in enumerate(edge_class_names)}
+        for name in cls.BUFFERS:
+            setattr(graph, name, buffers[name])
+        graph.Token = uuid.uuid4().hex
+        graph._reset_changes()
+        for name, value in (changes or {}).items():
+            setattr(graph, name, value)
+        return graph
+    def replace_changes(self, version:int, nb_nodes:int, changes:dict=None):
+        """Remplacez les modifications en place par celles d'un autre instantané construit sur les mêmes tableaux, dont
+        les nœuds sont désignés par leur indice (instantané d'un processus du pool de chemins)."""
+        self._reset_changes()
+        for name, value in (changes or {}).items():
+            setattr(self, name, value)
+        for idx in range(len(self.Node_ids), nb_nodes):
+            self.Node_index[idx] = idx
+        self.Node_ids = range(nb_nodes)
+        self.Version = version
+    BUFFERS = ("Node_classes", "Out_offsets", "Out_targets", "Out_classes", "Out_edges", "In_offsets", "In_targets", "In_classes", "In_edges")
+
+    @staticmethod
+    def _code(codes:dict, name:str)->int:
+        if name not in codes:
+            codes[name] = len(codes)
+        return codes[name]
+
+    def _build(self, rows, columns, classes):
+        """Tri par dénombrement des arêtes selon leur ligne : O(N + E)."""
+        nb_nodes = len(self.Node_ids)
+        offsets = array('q', bytes(8 * (nb_nodes + 1)))
+        for row in rows:
+            offsets[row + 1] += 1
+        for idx in range(nb_nodes):
+            offsets[idx + 1] += offsets[idx]
+        cursor = array('q', offsets)
+        sorted_columns = array('i', bytes(4 * len(rows)))
+        sorted_classes = array('i', bytes(4 * len(rows)))
+        sorted_edges = array('i', bytes(4 * len(rows)))
+        for position, row in enumerate(rows):
+            slot = cursor[row]
+            cursor[row] += 1
+            sorted_columns[slot] = columns[position]
+            sorted_classes[slot] = classes[position]
+            sorted_edges[slot] = position
+        return offsets, sorted_columns, sorted_classes, sorted_edges
+
+    # MODIFICATIONS EN PLACE =========================================================================================
+    def can_absorb(self, nb_changes:int)->bool:
+        """Les modifications sont gardées à côté des tableaux jusqu'au quart des arêtes du CSR ; au-delà,
+        OneRingDB reconstruit l'instantané."""
+        return self.Nb_changes + nb_changes <= max(1024, len(self.Out_targets) // 4)
+    def add_node(self, node_id, node_class:str):
+        """Numérotez un nouveau nœud, ou notez la nouvelle classe d'un nœud existant."""
+        if node_id not in self.Node_index:
+            self.Node_index[node_id] = len(self.Node_ids)
+            self.Node_ids.append(node_id)
+        self.Changed_node_classes[self.Node_index[node_id]] = self._code(self.Node_class_codes, node_class)
+        self.Nb_changes += 1
+    def remove_node(self, node_id):
+        """Un nœud supprimé garde son indice : ses arêtes ont déjà été retirées, aucun parcours ne l'atteint."""
+        self.Nb_changes += 1
+    def add_edge(self, edge:Edge):
+        position = len(self.Edge_ids)
+        self.Edge_ids.append(edge.Id)
+        if self.Edge_position is not None:
+            self.Edge_position[edge.Id] = position
+        source, target = self.Node_index[edge.Source_id], self.Node_index[edge.Target_id]
+        self.Added_edges[position] = (source, target, self._code(self.Edge_class_codes, edge.Edge_class))
+        self.Added_out[source].append(position)
+        self.Added_in[target].append(position)
+        self.Nb_changes += 1
+    def remove_edge(self, edge:Edge):
+        if self.Edge_position is None:
+            self.Edge_position = {edge_id:position for position, edge_id in enumerate(self.Edge_ids)}
+        position = self.Edge_position.pop(edge.Id)
+        added = self.Added_edges.pop(position, None)
+        if added is None:
+            self.Removed_edges.add(position)
+        else:
+            self.Added_out[added[0]].remove(position)
+            self.Added_in[added[1]].remove(position)
+        self.Nb_changes += 1
+
+    def _row(self, idx:int, offsets, columns, edges, added:dict, end:int)->list:
+        """Voisins de idx dans les tableaux CSR, sans les arêtes retirées, suivis des voisins par les arêtes ajoutées."""
+        row = []
+        if idx < len(offsets) - 1:
+            start, stop = offsets[idx], offsets[idx + 1]
+            removed = self.Removed_edges
+            if removed:
+                row = [column for column, position in zip(columns[start:stop], edges[start:stop]) if position not in removed]
+            else:
+                row = list(columns[start:stop])
+        positions = added.get(idx)
+        if positions:
+            row += [self.Added_edges[position][end] for position in positions]
+        return row
+    def successors(self, idx:int):
+        if not self.Nb_changes:
+            return self.Out_targets[self.Out_offsets[idx]:self.Out_offsets[idx + 1]]
+        return self._row(idx, self.Out_offsets, self.Out_targets, self.Out_edges, self.Added_out, 1)
+    def predecessors(self, idx:int):
+        if not self.Nb_changes:
+            return self.In_targets[self.In_offsets[idx]:self.In_offsets[idx + 1]]
+        return self._row(idx, self.In_offsets, self.In_targets, self.In_edges, self.Added_in, 0)
+    def _edge_row(self, idx:int, offsets, columns, positions, classes, added:dict, end:int):
+        row = ()
+        if idx < len(offsets) - 1:
+            start, stop = offsets[idx], offsets[idx + 1]
+            row = zip(columns[start:stop], positions[start:stop], classes[start:stop])
+            if self.Removed_edges:
+                removed = self.Removed_edges
+                row = (edge for edge in row if edge[1] not in removed)
+        if added.get(idx):
+            row = chain(row, ((self.Added_edges[position][end], position, self.Added_edges[position][2]) for position in added[idx]))
+        return row
+    def edges_from(self, idx:int, ignore_direction:bool=False, backward:bool=False):
+        """Arêtes de idx en triplets (voisin, position dans Edge_ids, code de classe) : sortantes (entrantes si backward),
+        puis celles de l'autre sens avec ignore_direction."""
+        out_row = (self.Out_offsets, self.Out_targets, self.Out_edges, self.Out_classes, self.Added_out, 1)
+        in_row = (self.In_offsets, self.In_targets, self.In_edges, self.In_classes, self.Added_in, 0)
+        first, second = (in_row, out_row) if backward else (out_row, in_row)
+        edges = self._edge_row(idx, *first)
+        if ignore_direction:
+            edges = chain(edges, self._edge_row(idx, *second))
+        return edges
+    def class_codes(self, edge_classes=(), node_classes=())->Tuple[set, set]:
+        """Codes des classes d'arêtes à suivre (None sans restriction) et des classes de nœuds à éviter. Une classe
+        qui n'a aucun élément dans l'instantané n'a pas de code : VIA ne suit alors aucune de ses arêtes."""
+        edge_codes = {self.Edge_class_codes[name] for name in edge_classes if name in self.Edge_class_codes} if edge_classes else None
+        return edge_codes, {self.Node_class_codes[name] for name in node_classes if name in self.Node_class_codes}
+    def step(self, backward:bool=False, ignore_direction:bool=False, edge_codes:set=None, avoided_codes:set=None, endpoints=()):
+        """Fonction idx -> voisins d'un parcours : successeurs (prédécesseurs si backward, les deux avec ignore_direction).
+        Avec edge_codes, seules les arêtes de ces classes sont suivies ; avec avoided_codes, les nœuds de ces classes
+        ne sont pas atteints, sauf les extrémités `endpoints` du chemin. Le filtre est fait pendant le parcours."""
+        if edge_codes is None and not avoided_codes:
+            if ignore_direction:
+                return lambda idx: self.neighbours(idx, True)
+            return self.predecessors if backward else self.successors
+        def step(idx:int):
+            for neighbour, _, edge_code in self.edges_from(idx, ignore_direction, backward):
+                if edge_codes is not None and edge_code not in edge_codes:
+                    continue
+                if avoided_codes and self.node_class(neighbour) in avoided_codes and neighbour not in endpoints:
+                    continue
+                yield neighbour
+        return step
+    def edge_weights(self, key:str, edges:dict)->array:
+        """Poids des arêtes pour la propriété `key`, par position dans Edge_ids. Le tableau est converti une fois depuis
+        les propriétés (des chaînes) puis gardé jusqu'à une modification de la propriété ; les arêtes ajoutées en place
+        y sont converties à la demande. Une arête sans valeur numérique a un poids infini : elle n'est jamais suivie."""
+        weights = self.Weights.get(key)
+        if weights is not None and len(weights) == len(self.Edge_ids):
+            return weights
+        # Complété dans une copie puis publié d'une seule affectation : des LINK concurrents (serveur, sous le verrou
+        # de lecture) ne voient jamais un tableau à moitié étendu, ni étendu deux fois
+        new_weights = array('d', weights or ())
+        for edge_id in self.Edge_ids[len(new_weights):]:
+            edge = edges.get(edge_id)
+            try:
+                weight = float(edge.Properties[key])
+            except (AttributeError, KeyError, TypeError, ValueError):
+                weight = float("inf")
+            if weight < 0:
+                raise ValueError(f"Le poids {key} = {edge.Properties[key]} d'une arête {edge.Edge_class} est négatif : le plus court chemin pondéré attend des poids positifs.")
+            new_weights.append(weight)
+        self.Weights[key] = new_weights
+        return new_weights
+    def node_class(self, idx:int)->int:
+        return self.Changed_node_classes.get(idx, self.Node_classes[idx] if idx < len(self.Node_classes) else -1)
+    def neighbours(self, idx:int, ignore_direction:bool=False):
+        if ignore_direction:
+            return chain(self.successors(idx), self.predecessors(idx))
+        return self.successors(idx)
+    def __len__(self)->int:
+        return len(self.Node_ids)
+
+class OneRingDB:
+    def __init__(self, compact:bool=False):
+        """En mode compact, les Id sont des entiers denses et les classes et clés de propriétés sont internées."""
+        self.Compact = compact
+        self.NextNodeId = 0
+        self.NextEdgeId = 0
+        # Incrémenté à chaque modification de la topologie ; invalide l'instantané CSR
+        self.TopologyVersion = 0
+        self.AdjacencySnapshot:CSRSnapshot = None
+        # Les lectures concurrentes (serveur) peuvent toutes vouloir reconstruire l'instantané : une seule le fait
+        self.Snapshot_lock = threading.Lock()
+        # Journal d'annulation de la transaction ouverte (None hors transaction)
+        self.Journal:list = None
         self.NodeDictionary = {}
         self.EdgeDictionary = {}
         self.Name2Nodes:Dict[str:List[Node]] = defaultdict(list)
-        self.SourceTargetNames2Edge:Dict[Tuple[str, str]:Edge] = {}
+        # Index des arêtes par ids des extrémités : (source, cible) -> ids, et (source, cible, classe) -> id ou ids.
+        # Presque toutes les entrées du second ne comptent qu'une arête : elle y est rangée seule, sans ensemble.
+        self.NodePair2Edges:Dict[Tuple[str, str]:OrderedIds] = defaultdict(OrderedIds)
+        self.NodePairClass2Edges:Dict[Tuple[str, str, str]:object] = {}
+        self.NamePrefixIndex = NamePrefixIndex()
+        # Index de classes et de propriétés : classe -> ids, (classe, clé, valeur) -> ids
+        self.Class2Nodes:Dict[str:OrderedIds] = defaultdict(OrderedIds)
+        self.NodePropertyIndex:Dict[Tuple[str, str, object]:OrderedIds] = defaultdict(OrderedIds)
+        self.Class2Edges:Dict[str:OrderedIds] = defaultdict(OrderedIds)
+        self.EdgePropertyIndex:Dict[Tuple[str, str, object]:OrderedIds] = defaultdict(OrderedIds)
+
+    # INDEX ===========================================================================================================
+    @staticmethod
+    def _index_value(value):
+        """Les valeurs non hachables (listes, dictionnaires) sont indexées par leur représentation."""
+        try:
+            hash(value)
+            return value
+        except TypeError:
+            return repr(value)
+    def _index_element(self, class_index, property_index, element_class:str, element_id:str, properties:dict):
+        class_index[element_class].add(element_id)
+        for key, value in properties.items():
+            property_index[(element_class, key, self._index_value(value))].add(element_id)
+    def _unindex_element(self, class_index, property_index, element_class:str, element_id:str, properties:dict):
+        self._discard_from_index(class_index, element_class, element_id)
+        for key, value in properties.items():
+            self._discard_from_index(property_index, (element_class, key, self._index_value(value)), element_id)
+    @staticmethod
+    def _discard_from_index(index, index_key, element_id:str):
+        ids = index.get(index_key)
+        if ids is not None:
+            ids.discard(element_id)
+            if not ids:
+                del index[index_key]
+    @staticmethod
+    def _add_to_compact_index(index, index_key, element_id):
+        """Index dont les entrées d'un seul id le rangent tel quel ; un ensemble ordonné n'est créé qu'au second id."""
+        ids = index.get(index_key)
+        if ids is None:
+            index[index_key] = element_id
+        elif type(ids) is OrderedIds:
+            ids.add(element_id)
+        elif ids != element_id:
+            index[index_key] = OrderedIds.fromkeys((ids, element_id))
+    @staticmethod
+    def _discard_from_compact_index(index, index_key, element_id):
+        ids = index.get(index_key)
+        if ids is None:
+            return
+        if type(ids) is OrderedIds:
+            ids.discard(element_id)
+            if len(ids) == 1:
+                index[index_key] = next(iter(ids))
+        elif ids == element_id:
+            del index[index_key]
+    @staticmethod
+    def _compact_index_ids(index, index_key):
+        """Retournez les ids d'une entrée de _add_to_compact_index, comme un ensemble ordonné ou un tuple."""
+        ids = index.get(index_key)
+        if ids is None:
+            return ()
+        return ids if type(ids) is OrderedIds else (ids,)
+    @staticmethod
+    def _discard_all_from_index(index, groups:dict):
+        """Retirez des ids par entrées entières : `groups` associe une clé de l'index aux ids à retirer."""
+        for index_key, element_ids in groups.items():
+            ids = index.get(index_key)
+            if ids is not None:
+                ids -= element_ids
+                if not ids:
+                    del index[index_key]
+    def _unindex_elements(self, class_index, property_index, elements:list):
+        """Retirez des nœuds ou des arêtes des index. Les ids sont retirés de l'index de classes par ensembles entiers ;
+        les entrées de l'index de propriétés, souvent propres à un seul élément, sont vidées une à une."""
+        class_groups = defaultdict(set)
+        for element in elements:
+            element_class = element.Node_class if isinstance(element, Node) else element.Edge_class
+            class_groups[element_class].add(element.Id)
+            for key, value in element.Properties.items():
+                self._discard_from_index(property_index, (element_class, key, self._index_value(value)), element.Id)
+        self._discard_all_from_index(class_index, class_groups)
+    def _match_ids(self, class_index, property_index, classes, condition)->OrderedIds:
+        """Retournez les ids des éléments des classes `classes` satisfaisant la condition.
+        Les conditions AND (dictionnaire) deviennent des intersections, les conditions OR (liste) des unions."""
+        return self.run_plan(self.plan_match(class_index, property_index, classes, condition))
+
+    # PLANIFICATEUR ===================================================================================================
+    def _plan_clause(self, property_index, element_class:str, class_ids:set, clause:dict)->ORPlanStep:
+        """Plan d'une conjonction sur une classe, ou None si un prédicat ne trouve aucun élément.
+        Les tailles des ensembles de l'index sont les cardinalités exactes de chaque prédicat."""
+        seeks = []
+        for key, value in clause.items():
+            ids = property_index.get((element_class, key, self._index_value(value)))
+            if not ids:
+                return None
+            # Un prédicat vrai pour toute la classe ne filtre rien
+            if len(ids) == len(class_ids):
+                continue
+            seeks.append(ORPlanStep("IndexSeek", f"{element_class}.{key} = {value}", len(ids), ids=ids))
+        if not seeks:
+            return ORPlanStep("ClassScan", element_class, len(class_ids), ids=class_ids)
+        if len(seeks) == 1:
+            return seeks[0]
+        # Intersection en partant de l'ensemble le plus petit ; estimation sous hypothèse d'indépendance
+        seeks.sort(key=lambda seek: seek.Estimated_rows)
+        estimated_rows = seeks[0].Estimated_rows
+        for seek in seeks[1:]:
+            estimated_rows *= seek.Estimated_rows / len(class_ids)
+        return ORPlanStep("Intersect", element_class, max(1, round(estimated_rows)), seeks)
+
+    def plan_match(self, class_index, property_index, classes, condition)->ORPlanStep:
+        """Choisissez le chemin d'accès d'une condition sur les classes `classes` : parcours de classe,
+        recherche dans l'index de propriétés ou intersection de recherches, réunis par une union pour les OR.
+        Les classes et les clauses qui ne peuvent rien retourner sont écartées sans être lues."""
+        clauses = [condition] if type(condition) is dict else condition
+        branches = []
+        for element_class in classes:
+            class_ids = class_index.get(element_class)
+            if not class_ids:
+                continue
+            class_branches = []
+            for clause in clauses:
+                branch = self._plan_clause(property_index, element_class, class_ids, clause)
+                if branch is None:
+                    continue
+                if branch.Operator == "ClassScan":
+                    # Une clause OR couvre toute la classe : les autres sont inutiles
+                    class_branches = [branch]
+                    break
+                class_branches.append(branch)
+            branches += class_branches
+        if not branches:
+            return ORPlanStep("Empty", "aucun élément ne peut satisfaire la condition")
+        if len(branches) == 1:
+            return branches[0]
+        # Les branches gardent l'ordre des classes et des clauses : l'union suit l'ordre de création
+        return ORPlanStep("Union", "", sum(branch.Estimated_rows for branch in branches), branches)
+
+    def _run_step(self, step:ORPlanStep)->OrderedIds:
+        if step.Ids is not None:
+            return step.Ids
+        # Intersections et unions gardent l'ordre de leurs entrées, comme le parcours paresseux
+        if step.Operator == "Intersect":
+            ids = self._run_step(step.Children[0])
+            for child in step.Children[1:]:
+                ids = filter(self._run_step(child).__contains__, ids)
+            return OrderedIds.fromkeys(ids)
+        ids = OrderedIds()
+        for child in step.Children:
+            ids.update(self._run_step(child))
+        return ids
+
+    def iter_plan(self, step:ORPlanStep, profile:bool=False):
+        """Parcourez paresseusement les ids d'un plan de plan_match : rien n'est lu au-delà de ce que le consommateur
+        demande. Avec profile=True, chaque opérateur compte ses lignes et son temps pendant le parcours."""
+        ids = self._iter_step(step, profile)
+        return step.track(ids) if profile else ids
+
+    def _iter_step(self, step:ORPlanStep, profile:bool):
+        if step.Ids is not None:
+            yield from step.Ids
+        elif step.Operator == "Intersect":
+            # Les enfants d'une intersection sont des IndexSeek : on parcourt le plus petit et on sonde les autres
+            smallest, others = step.Children[0], [child.Ids for child in step.Children[1:]]
+            for element_id in self.iter_plan(smallest, profile):
+                if all(element_id in ids for ids in others):
+                    yield element_id
+        elif step.Operator == "Union":
+            seen = set()
+            for child in step.Children:
+                for element_id in self.iter_plan(child, profile):
+                    if element_id not in seen:
+                        seen.add(element_id)
+                        yield element_id
+
+    def satisfies(self, property_index, element_class:str, element_id:str, condition)->bool:
+        """Vérifiez par l'index de propriétés qu'un élément satisfait une condition, comme le ferait plan_match."""
+        clauses = [condition] if type(condition) is dict else condition
+        return any(all(element_id in property_index.get((element_class, key, self._index_value(value)), ()) for key, value in clause.items())
+                   for clause in clauses)
+
+    def run_plan(self, step:ORPlanStep)->OrderedIds:
+        """Exécutez un plan de plan_match d'un bloc et retournez un nouvel ensemble ordonné d'ids."""
+        ids = self._run_step(step)
+        return OrderedIds.fromkeys(ids) if ids is step.Ids else ids
+
+    # MOTIFS ==========================================================================================================
+    def _plan_pattern_node(self, node:"ORNodePattern")->ORPlanStep:
+        """Chemin d'accès aux candidats d'un nœud de motif : homonymes d'un nom fixé, plan_match des propriétés,
+        parcours de la classe ou de toute la base."""
+        if node.Name is not None:
+            homonyms = self.Name2Nodes.get(node.Name, ())
+            return ORPlanStep("NameLookup", node.Name, len(homonyms), ids=[homonym.Id for homonym in homonyms])
+        if node.Properties:
+            classes = [node.Class] if node.Class else list(self.Class2Nodes)
+            return self.plan_match(self.Class2Nodes, self.NodePropertyIndex, classes, node.Properties)
+        if node.Class:
+            class_ids = self.Class2Nodes.get(node.Class, ())
+            return ORPlanStep("ClassScan", node.Class, len(class_ids), ids=class_ids)
+        return ORPlanStep("FullScan", "", len(self.NodeDictionary), ids=self.NodeDictionary)
+
+    def _count_pattern_edges(self, relationship:"ORRelationshipPattern")->int:
+        """Nombre d'arêtes de la base qui satisfont la classe et les propriétés d'une relation de motif."""
+        if relationship.Properties:
+            classes = [relationship.Class] if relationship.Class else list(self.Class2Edges)
+            return self.plan_match(self.Class2Edges, self.EdgePropertyIndex, classes, relationship.Properties).Estimated_rows
+        if relationship.Class:
+            return len(self.Class2Edges.get(relationship.Class, ()))
+        return len(self.EdgeDictionary)
+
+    @staticmethod
+    def _describe_pattern_node(node:"ORNodePattern")->str:
+        label = node.Variable or (f'"{node.Name}"' if node.Name is not None else "")
+        return f"({label}:{node.Class})" if node.Class else f"({label})"
+
+    def plan_pattern(self, nodes:List["ORNodePattern"], relationships:List["ORRelationshipPattern"])->ORPlanStep:
+        """Plan d'un motif MATCH : le nœud le plus sélectif sert d'ancre, puis le motif est étendu une relation à la
+        fois, du côté dont le prochain nœud a le moins de candidats. Un Expand estime ses lignes par le nombre moyen
+        d'arêtes de la relation par nœud et la part des nœuds qui satisfont le nœud atteint ; un nœud dont la variable
+        est déjà liée ne se parcourt pas, il se vérifie dans NodePair2Edges ou NodePairClass2Edges (Expand into)."""
+        accesses = [self._plan_pattern_node(node) for node in nodes]
+        total = max(1, len(self.NodeDictionary))
+        anchor = min(range(len(nodes)), key=lambda position: accesses[position].Estimated_rows)
+        step, rows = accesses[anchor], accesses[anchor].Estimated_rows
+        left = right = anchor
+        bound = {nodes[anchor].Variable: anchor}
+        while left > 0 or right < len(nodes) - 1:
+            if right == len(nodes) - 1 or (left > 0 and accesses[left - 1].Estimated_rows <= accesses[right + 1].Estimated_rows):
+                position, source, target = left - 1, left, left - 1
+                left -= 1
+            else:
+                position, source, target = right, right, right + 1
+                right += 1
+            relationship, variable = relationships[position], nodes[target].Variable
+            into = bound.get(variable) if variable is not None else None
+            per_node = self._count_pattern_edges(relationship) / total * (2 if relationship.Direction == 'both' else 1)
+            rows *= per_node * (1 if into is None else 1 / total) * accesses[target].Estimated_rows / total
+            # Sens de parcours : une relation lue de droite à gauche est inversée
+            direction = relationship.Direction if target > source else {'out': 'in', 'in': 'out', 'both': 'both'}[relationship.Direction]
+            edge = f"[{relationship.Variable or ''}:{relationship.Class}]" if relationship.Class else f"[{relationship.Variable or ''}]"
+            arrow = {'out': f"-{edge}->", 'in': f"<-{edge}-", 'both': f"-{edge}-"}[direction]
+            detail = f"{self._describe_pattern_node(nodes[source])}{arrow}{self._describe_pattern_node(nodes[target])}"
+            step = ORPlanStep("Expand into" if into is not None else "Expand", detail, max(1, round(rows)) if rows else 0, [step],
+                              args=(position, source, target, direction, into))
+            if variable is not None:
+                bound.setdefault(variable, target)
+        variables = [element.Variable for element in nodes + relationships if element.Variable is not None]
+        return ORPlanStep("Match", ", ".join(dict.fromkeys(variables)), step.Estimated_rows, [step], args=anchor)
+
+    def _fits_pattern_node(self, node:"ORNodePattern", node_id)->bool:
+        candidate = self.NodeDictionary[node_id]
+        if node.Name is not None and candidate.Name != node.Name:
+            return False
+        if node.Class and candidate.Node_class != node.Class:
+            return False
+        return not node.Properties or self.satisfies(self.NodePropertyIndex, candidate.Node_class, node_id, node.Properties)
+
+    def iter_pattern(self, nodes:List["ORNodePattern"], relationships:List["ORRelationshipPattern"], step:ORPlanStep, profile:bool=False):
+        """Parcourez paresseusement les correspondances d'un plan de plan_pattern. Une correspondance est le couple
+        (ids des nœuds, ids des arêtes) dans l'ordre du motif ; une même arête n'y apparaît qu'une fois.
+        Avec profile=True, l'ancre et chaque Expand comptent leurs lignes et leur temps."""
+        expands = []
+        access = step.Children[0]
+        while access.Operator.startswith("Expand"):
+            expands.append(access)
+            access = access.Children[0]
+        anchor = step.Args
+        empty_nodes, empty_edges = (None,) * len(nodes), (None,) * len(relationships)
+        candidates = self.iter_plan(access, profile)
+        # Les homonymes d'un nom fixé n'ont pas encore été filtrés par classe et propriétés
+        if access.Operator == "NameLookup":
+            candidates = (node_id for node_id in candidates if self._fits_pattern_node(nodes[anchor], node_id))
+        bindings = (((*empty_nodes[:anchor], node_id, *empty_nodes[anchor + 1:]), empty_edges) for node_id in candidates)
+        for expand in reversed(expands):
+            bindings = self._expand_pattern(nodes, relationships, expand, bindings)
+            if profile:
+                bindings = expand.track(bindings)
+        return step.track(bindings) if profile else bindings
+
+    def _expand_pattern(self, nodes:List["ORNodePattern"], relationships:List["ORRelationshipPattern"], step:ORPlanStep, bindings):
+        position, source, target, direction, into = step.Args
+        relationship, node = relationships[position], nodes[target]
+        node_dictionary, edge_dictionary = self.NodeDictionary, self.EdgeDictionary
+        # Avec une classe, les arêtes de la paire sont lues dans l'index (source, cible, classe)
+        if relationship.Class:
+            pair_ids = lambda pair: self._compact_index_ids(self.NodePairClass2Edges, (*pair, relationship.Class))
+        else:
+            pair_ids = lambda pair: self.NodePair2Edges.get(pair, ())
+        for node_ids, edge_ids in bindings:
+            source_id = node_ids[source]
+            if into is not None:
+                # Les deux extrémités sont liées : seules les arêtes de la paire sont lues
+                target_id = node_ids[into]
+                steps = []
+                if direction != 'in':
+                    steps += [(edge_id, target_id) for edge_id in pair_ids((source_id, target_id))]
+                if direction != 'out' and (direction == 'in' or source_id != target_id):
+                    steps += [(edge_id, target_id) for edge_id in pair_ids((target_id, source_id))]
+            else:
+                source_node = node_dictionary[source_id]
+                steps = []
+                if direction != 'in':
+                    steps = ((edge_id, edge_dictionary[edge_id].Target_id) for edge_id in source_node.Out_edges)
+                if direction == 'in':
+                    steps = ((edge_id, edge_dictionary[edge_id].Source_id) for edge_id in source_node.In_edges)
+                elif direction == 'both':
+                    # Une boucle est à la fois sortante et entrante : elle n'est lue qu'une fois
+                    incoming = ((edge_id, edge_dictionary[edge_id].Source_id) for edge_id in source_node.In_edges)
+                    steps = chain(steps, ((edge_id, other_id) for edge_id, other_id in incoming if other_id != source_id))
+            for edge_id, other_id in steps:
+                if edge_id in edge_ids:
+                    continue
+                edge = edge_dictionary[edge_id]
+                if relationship.Class and edge.Edge_class != relationship.Class:
+                    continue
+                if relationship.Properties and not self.satisfies(self.EdgePropertyIndex, edge.Edge_class, edge_id, relationship.Properties):
+                    continue
+                if not self._fits_pattern_node(node, other_id):
+                    continue
+                yield ((*node_ids[:target], other_id, *node_ids[target + 1:]),
+                       (*edge_ids[:position], edge_id, *edge_ids[position + 1:]))
+
+    # AGRÉGATS ========================================================================================================
+    def count_plan(self, step:ORPlanStep)->int:
+        """Nombre d'ids d'un plan de plan_match. Un parcours de classe ou une recherche dans l'index est compté par la
+        taille de son ensemble ; les intersections et les unions sont comptées au fil du parcours, sans liste."""
+        if step.Ids is not None:
+            return len(step.Ids)
+        return sum(1 for _ in self.iter_plan(step))
+
+    def group_count(self, class_index, property_index, dictionary:dict, classes, key:str, ids=None)->Counter:
+        """Comptez par valeur de la propriété `key` (None quand elle manque) les éléments des classes `classes`, ou les
+        seuls éléments `ids` s'ils sont donnés. Sans `ids`, les entrées (classe, key, valeur) de l'index de propriétés
+        sont comptées par leur taille quand l'index est plus petit que les classes à parcourir."""
+        if ids is None:
+            size = sum(len(class_index.get(element_class, ())) for element_class in classes)
+            if len(property_index) < size:
+                wanted, counts = set(classes), Counter()
+                for (element_class, property_key, value), element_ids in property_index.items():
+                    if property_key == key and element_class in wanted:
+                        counts[value] += len(element_ids)
+                missing = size - sum(counts.values())
+                if missing:
+                    counts[None] = missing
+                return counts
+            ids = chain.from_iterable(class_index.get(element_class, ()) for element_class in classes)
+        values = (dictionary[element_id].Properties.get(key) for element_id in ids)
+        # Les valeurs non hachables sont comptées par leur représentation, comme dans l'index
+        return Counter(value if value.__hash__ is not None else repr(value) for value in values)
+
+    def top_by_degree(self, node_ids, k:int)->List[Tuple[Node, int]]:
+        """Les k nœuds de plus haut degré parmi `node_ids`, lus sur les compteurs d'arêtes, avec un tas de taille k."""
+        nodes = self.NodeDictionary
+        top = heapq.nlargest(k, node_ids, key=lambda node_id: nodes[node_id].get_degree())
+        return [(nodes[node_id], nodes[node_id].get_degree()) for node_id in top]
+
+    def _register_name(self, node:Node, position:int=None):
+        if node.Name not in self.Name2Nodes:
+            self.NamePrefixIndex.add(node.Name)
+        if position is None:
+            self.Name2Nodes[node.Name].append(node)
+        else:
+            self.Name2Nodes[node.Name].insert(position, node)
+    def _unregister_name(self, node:Node)->int:
+        """Retirez le nœud de ses homonymes et retournez sa position parmi eux."""
+        homonyms = self.Name2Nodes.get(node.Name, [])
+        position = None
+        for idx, indexed_node in enumerate(homonyms):
+            if indexed_node is node:
+                homonyms.pop(idx)
+                position = idx
+                break
+        if not homonyms:
+            self.Name2Nodes.pop(node.Name, None)
+            self.NamePrefixIndex.remove(node.Name)
+        return position
+
+    # ADJACENCE =======================================================================================================
+    def _live_snapshot(self, nb_changes:int=1)->CSRSnapshot:
+        """Avancez TopologyVersion pour une modification de `nb_changes` nœuds ou arêtes, et retournez l'instantané CSR
+        à mettre à jour en place. Retournez None s'il n'y en a pas, s'il est déjà périmé ou s'il dépasserait son seuil
+        de modifications : get_adjacency_snapshot le reconstruira."""
+        graph = self.AdjacencySnapshot
+        in_sync = graph is not None and graph.Version == self.TopologyVersion and graph.can_absorb(nb_changes)
+        self.TopologyVersion += 1
+        if not in_sync:
+            return None
+        graph.Version = self.TopologyVersion
+        return graph
+    def _edge_weights_changed(self, keys):
+        """Oubliez les poids en cache (voir CSRSnapshot.edge_weights) des propriétés d'arête modifiées."""
+        if self.AdjacencySnapshot is not None:
+            for key in keys:
+                self.AdjacencySnapshot.Weights.pop(key, None)
+    def _attach_edge(self, edge:Edge):
+        graph = self._live_snapshot()
+        if graph is not None:
+            graph.add_edge(edge)
+        source_node, target_node = self.NodeDictionary[edge.Source_id], self.NodeDictionary[edge.Target_id]
+        source_node.Out_edges.add(edge.Id)
+        target_node.In_edges.add(edge.Id)
+        self.NodePair2Edges[(edge.Source_id, edge.Target_id)].add(edge.Id)
+        self._add_to_compact_index(self.NodePairClass2Edges, (edge.Source_id, edge.Target_id, edge.Edge_class), edge.Id)
+        source_node.add_neighbour(target_node.Id)
+        target_node.add_neighbour(source_node.Id)
+    def _detach_edge(self, edge:Edge):
+        graph = self._live_snapshot()
+        if graph is not None:
+            graph.remove_edge(edge)
+        source_node, target_node = self.NodeDictionary[edge.Source_id], self.NodeDictionary[edge.Target_id]
+        source_node.Out_edges.discard(edge.Id)
+        target_node.In_edges.discard(edge.Id)
+        self._discard_from_index(self.NodePair2Edges, (edge.Source_id, edge.Target_id), edge.Id)
+        self._discard_from_compact_index(self.NodePairClass2Edges, (edge.Source_id, edge.Target_id, edge.Edge_class), edge.Id)
+        # Les deux nœuds ne restent voisins que si une autre arête les relie encore
+        if (edge.Source_id, edge.Target_id) not in self.NodePair2Edges and (edge.Target_id, edge.Source_id) not in self.NodePair2Edges:
+            source_node.remove_neighbour(target_node.Id)
+            target_node.remove_neighbour(source_node.Id)
+
+    # COMPACT =========================================================================================================
+    @staticmethod
+    def _intern_properties(properties:dict)->dict:
+        if not properties:
+            return properties
+        return {sys.intern(key) if isinstance(key, str) else key: value for key, value in properties.items()}
+    @staticmethod
+    def _random_suffixes(count:int)->List[str]:
+        """Suffixes aléatoires tirés d'un seul appel à os.urandom, pour les chargements en masse. Ce sont des UUID
+        version 4 comme ceux de uuid.uuid4() : le chiffre de version vaut 4 et celui de variante 8, 9, a ou b.
+        Les poser dans le texte coûte autant que le formatage, alors que uuid.UUID(bytes=...) est trois fois plus lent."""
+        digits = os.urandom(16 * count).hex()
+        variant = dict(zip("0123456789abcdef", "89ab89ab89ab89ab"))
+        return [f"{digits[i:i+8]}-{digits[i+8:i+12]}-4{digits[i+13:i+16]}-{variant[digits[i+16]]}{digits[i+17:i+20]}-{digits[i+20:i+32]}"
+                for i in range(0, 32 * count, 32)]
+    def _new_node(self, name:str, node_class:str=None, properties:dict=None, suffix:str=None)->Node:
+        if not self.Compact:
+            if suffix is not None:
+                return Node(name, node_class, properties, f"{node_class or 'default'}:{name}:{suffix}")
+            return Node(name, node_class, properties)
+        node = Node(name, sys.intern(node_class) if node_class else None, self._intern_properties(properties), self.NextNodeId)
+        self.NextNodeId += 1
+        return node
+    def _new_edge(self, source_id, target_id, edge_class:str=None, properties:dict=None, suffix:str=None)->Edge:
+        if not self.Compact:
+            if suffix is not None:
+                return Edge(source_id, target_id, edge_class, properties, f"{source_id}->{target_id}:{suffix}")
+            return Edge(source_id, target_id, edge_class, properties)
+        edge = Edge(source_id, target_id, sys.intern(edge_class) if edge_class else None, self._intern_properties(properties), self.NextEdgeId)
+        self.NextEdgeId += 1
+        return edge
 
     # CREATOR =========================================================================================================
     def create_node(self, name:str, node_class:str=None, properties:dict=None)->str:
-        node = Node(name, node_class, properties)
+        node = self._new_node(name, node_class, properties)
+        graph = self._live_snapshot()
+        if graph is not None:
+            graph.add_node(node.Id, node.Node_class)
         self.NodeDictionary[node.Id] = node
-        self.Name2Nodes[name].append(node)
+        self._register_name(node)
+        self._index_element(self.Class2Nodes, self.NodePropertyIndex, node.Node_class, node.Id, node.Properties)
+        if self.Journal is not None:
+            self.Journal.append(lambda: self.delete_node(node.Id))
         return node.Id
     def create_edge(self, source_id:str, target_id:str, edge_class=None, properties=None)->str:
         if source_id not in self.NodeDictionary or target_id not in self.NodeDictionary:
             raise ValueError("Les nœuds source et cible doivent exister dans la base de données.")
-        edge = Edge(source_id, target_id, edge_class, properties)
+        edge = self._new_edge(source_id, target_id, edge_class, properties)
         self.EdgeDictionary[edge.Id] = edge
-        self.NodeDictionary[source_id].add_neighbour(target_id)
-        self.NodeDictionary[target_id].add_neighbour(source_id)
-        self.SourceTargetNames2Edge[(self.get_node_by_id(source_id).Name, self.get_node_by_id(target_id).Name)] = edge
+        self._index_element(self.Class2Edges, self.EdgePropertyIndex, edge.Edge_class, edge.Id, edge.Properties)
+        self._attach_edge(edge)
+        if self.Journal is not None:
+            self.Journal.append(lambda: self.delete_edge(edge.Id))
         return edge.Id
+
+    # CHARGEMENT ======================================================================================================
+    def _install_nodes(self, nodes:List[Node]):
+        """Insérez des Node déjà construits dans NodeDictionary, Name2Nodes et les index, sans vérification."""
+        node_dictionary, name2nodes = self.NodeDictionary, self.Name2Nodes
+        class2nodes, node_property_index = self.Class2Nodes, self.NodePropertyIndex
+        for node in nodes:
+            node_dictionary[node.Id] = node
+            if node.Name not in name2nodes:
+                self.NamePrefixIndex.add(node.Name)
+            name2nodes[node.Name].append(node)
+            class2nodes[node.Node_class].add(node.Id)
+            for key, value in node.Properties.items():
+                node_property_index[(node.Node_class, key, self._index_value(value))].add(node.Id)
+        graph = self._live_snapshot(len(nodes))
+        if graph is not None:
+            for node in nodes:
+                graph.add_node(node.Id, node.Node_class)
+        if self.Journal is not None:
+            self.Journal.append(lambda: [self.delete_node(node.Id) for node in nodes if node.Id in self.NodeDictionary])
+    def _install_edges(self, edges:List[Edge]):
+        """Insérez des Edge déjà construites entre des nœuds existants, avec leurs index, sans vérification."""
+        node_dictionary, edge_dictionary = self.NodeDictionary, self.EdgeDictionary
+        class2edges, edge_property_index, node_pair2edges = self.Class2Edges, self.EdgePropertyIndex, self.NodePair2Edges
+        node_pair_class2edges, add_to_compact_index = self.NodePairClass2Edges, self._add_to_compact_index
+        for edge in edges:
+            source_node, target_node = node_dictionary[edge.Source_id], node_dictionary[edge.Target_id]
+            edge_dictionary[edge.Id] = edge
+            class2edges[edge.Edge_class].add(edge.Id)
+            for key, value in edge.Properties.items():
+                edge_property_index[(edge.Edge_class, key, self._index_value(value))].add(edge.Id)
+            source_node.Out_edges.add(edge.Id)
+            target_node.In_edges.add(edge.Id)
+            node_pair2edges[(source_node.Id, target_node.Id)].add(edge.Id)
+            add_to_compact_index(node_pair_class2edges, (source_node.Id, target_node.Id, edge.Edge_class), edge.Id)
+            source_node.Neighbours.add(target_node.Id)
+            target_node.Neighbours.add(source_node.Id)
+        graph = self._live_snapshot(len(edges))
+        if graph is not None:
+            for edge in edges:
+                graph.add_edge(edge)
+        if self.Journal is not None:
+            self.Journal.append(lambda: [self.delete_edge(edge.Id) for edge in edges if edge.Id in self.EdgeDictionary])
+    def bulk_load(self, nodes:Dict[str, str], relationships:List[Tuple[str, str, str, dict]])->Tuple[int, int]:
+        """Chargez en une seule passe des nœuds {nom: classe} et des relations [source, cible, classe, propriétés].
+        Tous les index sont construits au fil de l'eau et les noms sont résolus par Name2Nodes ; les vérifications
+        faites par create_node et create_edge sont omises. Retournez le nombre de nœuds et d'arêtes créés."""
+        return self.bulk_create([(name, node_class, None) for name, node_class in nodes.items()], relationships)
+    def bulk_create(self, nodes:List[Tuple[str, str, dict]], relationships:List[Tuple[str, str, str, dict]])->Tuple[int, int]:
+        """Comme bulk_load, avec des nœuds (nom, classe, propriétés) : les homonymes sont permis.
+        Les nœuds sont insérés avant les relations, qui peuvent donc les citer."""
+        # En mode compact les Id sont des entiers : pas besoin de suffixes aléatoires
+        node_suffixes = [None] * len(nodes) if self.Compact else self._random_suffixes(len(nodes))
+        edge_suffixes = [None] * len(relationships) if self.Compact else self._random_suffixes(len(relationships))
+
+        self._install_nodes([self._new_node(name, node_class, properties, suffix) for (name, node_class, properties), suffix in zip(nodes, node_suffixes)])
+
+        name2nodes = self.Name2Nodes
+        edges = []
+        for (source_name, target_name, edge_class, edge_properties), suffix in zip(relationships, edge_suffixes):
+            # Comme get_node_by_name : le premier homonyme est retenu
+            source_node = name2nodes[source_name][0] if source_name in name2nodes else self.get_node_by_name(source_name)
+            target_node = name2nodes[target_name][0] if target_name in name2nodes else self.get_node_by_name(target_name)
+            edges.append(self._new_edge(source_node.Id, target_node.Id, edge_class, edge_properties, suffix))
+        self._install_edges(edges)
+        return len(nodes), len(edges)
+    def bulk_load_file(self, path:str)->Tuple[int, int]:
+        """Chargez un fichier JSON au format {"nodes": {...}, "relationships": [...]} avec bulk_load."""
+        with open(path, encoding="utf-8") as f:
+            content = json.load(f)
+        return self.bulk_load(content.get("nodes", {}), content.get("relationships", []))
+    def _load_in_batches(self, records, batch_size:int)->Tuple[int, int]:
+        """Chargez des enregistrements ('node', nom, classe) ou ('relationship', relation) par lots via bulk_load."""
+        nodes, relationships = {}, []
+        nb_nodes, nb_edges = 0, 0
+        for kind, *record in records:
+            if kind == "node":
+                name, node_class = record
+                # Un homonyme dans le même lot écraserait le premier : on vide le lot avant
+                if name in nodes:
+                    loaded = self.bulk_load(nodes, relationships)
+                    nb_nodes, nb_edges, nodes, relationships = nb_nodes + loaded[0], nb_edges + loaded[1], {}, []
+                nodes[name] = node_class
+            else:
+                relationships.append(record[0])
+            if len(nodes) + len(relationships) >= batch_size:
+                loaded = self.bulk_load(nodes, relationships)
+                nb_nodes, nb_edges, nodes, relationships = nb_nodes + loaded[0], nb_edges + loaded[1], {}, []
+        if nodes or relationships:
+            loaded = self.bulk_load(nodes, relationships)
+            nb_nodes, nb_edges = nb_nodes + loaded[0], nb_edges + loaded[1]
+        return nb_nodes, nb_edges
+    def stream_load(self, stream, batch_size:int=10000, json_lines:bool=False)->Tuple[int, int]:
+        """Chargez un flux JSON {"nodes": {...}, "relationships": [...]} sans le matérialiser entièrement :
+        les enregistrements sont lus au fil de l'eau et passés à bulk_load par lots de `batch_size`.
+        Les nœuds doivent précéder les relations qui les citent, comme dans les fichiers du corpus.
+        Avec json_lines=True, chaque ligne est soit un nœud {"name": ..., "class": ...}, soit une relation
+        [source, cible, classe, propriétés]."""
+        if json_lines:
+            records = self._iter_json_lines(stream)
+        else:
+            records = self._iter_json_document(stream)
+        return self._load_in_batches(records, batch_size)
+    def stream_load_file(self, path:str, batch_size:int=10000)->Tuple[int, int]:
+        """Comme stream_load ; les fichiers .jsonl et .ndjson sont lus en JSON Lines."""
+        with open(path, encoding="utf-8") as f:
+            return self.stream_load(f, batch_size, json_lines=path.endswith((".jsonl", ".ndjson")))
+    @staticmethod
+    def _iter_json_document(stream):
+        reader = JSONStreamReader(stream)
+        reader.expect("{")
+        for key in OneRingDB._iter_top_level_keys(reader):
+            if key == "nodes":
+                reader.expect("{")
+                for name, node_class in reader.iter_object():
+                    yield "node", name, node_class
+            elif key == "relationships":
+                reader.expect("[")
+                for relationship in reader.iter_array():
+                    yield "relationship", relationship
+            else:
+                reader.decode_value()
+    @staticmethod
+    def _iter_top_level_keys(reader:JSONStreamReader):
+        """Itérez sur les clés de l'objet racine ; l'appelant consomme chaque valeur avant de reprendre."""
+        if reader.peek() == "}":
+            return
+        while True:
+            key = reader.decode_value()
+            reader.expect(":")
+            yield key
+            if reader.peek() == ",":
+                reader.Position += 1
+            else:
+                reader.expect("}")
+                return
+    @staticmethod
+    def _iter_json_lines(stream):
+        if isinstance(stream.read(0), bytes):
+            stream = io.TextIOWrapper(stream, encoding="utf-8")
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, dict):
+                yield "node", record["name"], record.get("class")
+            else:
+                yield "relationship", record
     
     # GETTER ==========================================================================================================
     def get_node_by_id(self, node_id:str)->Node:
@@ -76,241 +1153,136 @@ class OneRingDB:
         if edge_id not in self.EdgeDictionary:
             raise ValueError("L'arête recherchée ne figure pas dans la base de données.")
         return self.EdgeDictionary.get(edge_id)
+    def get_incident_edges(self, node_id:str, direction:str="both")->List[Edge]:
+        """Retournez les arêtes du nœud : 'out' pour les sortantes, 'in' pour les entrantes, 'both' pour toutes."""
+        node = self.get_node_by_id(node_id)
+        edge_ids = []
+        if direction in ("out", "both"):
+            edge_ids += node.Out_edges
+        if direction in ("in", "both"):
+            edge_ids += node.In_edges
+        return [self.EdgeDictionary[edge_id] for edge_id in edge_ids]
+    def get_degree(self, node_id:str, direction:str="both")->int:
+        """Retournez le degré du nœud : 'out', 'in' ou 'both'."""
+        node = self.get_node_by_id(node_id)
+        if direction == "out":
+            return len(node.Out_edges)
+        if direction == "in":
+            return len(node.In_edges)
+        return node.get_degree()
+    def get_successors(self, node_id:str)->List[str]:
+        """Retournez les ids des nœuds atteints par les arêtes sortantes."""
+        return list({self.EdgeDictionary[edge_id].Target_id for edge_id in self.get_node_by_id(node_id).Out_edges})
+    def get_predecessors(self, node_id:str)->List[str]:
+        """Retournez les ids des nœuds d'où partent les arêtes entrantes."""
+        return list({self.EdgeDictionary[edge_id].Source_id for edge_id in self.get_node_by_id(node_id).In_edges})
     def get_node_by_name(self, node_name:str, find_single_node=True):
         """Si find_single_node == False, retournez une liste de Node débutant de `node_name`"""
         if find_single_node:
-            for name in self.Name2Nodes:
-                if name == node_name:
-                    if self.Name2Nodes[node_name]:
-                        return self.Name2Nodes[node_name][0]
-                    else:
-                        raise ValueError(f"Le nœud recherché {node_name} ne figure pas dans la base de données.")
+            homonyms = self.Name2Nodes.get(node_name)
+            if not homonyms:
+                raise ValueError(f"Le nœud recherché {node_name} ne figure pas dans la base de données.")
+            return homonyms[0]
         else:
             founded_nodes = []
-            for name in self.Name2Nodes:
-                if name.startswith(node_name):
-                    founded_nodes += self.Name2Nodes[name]
+            for name in self.NamePrefixIndex.startswith(node_name):
+                founded_nodes += self.Name2Nodes[name]
             if founded_nodes:
                 return founded_nodes
             raise ValueError(f"Le nœud recherché {node_name} ne figure pas dans la base de données.")
     def get_nodes_by_class(self, class_name:str, condition=None)->List[Node]:
         """Retournez les Node de telle classe avec telles conditions. Les conditions AND sont en dictionnaire, tandis que les conditions OR sont en liste"""
         if not condition:
-            return [node for node in self.NodeDictionary.values() if node.Node_class == class_name]
-        else:
-            nodes_to_return = []
-            if type(condition) is dict:
-                for node in self.NodeDictionary.values():
-                    if node.Node_class == class_name:
-                        flag = True
-                        for key, value in condition.items():
-                            if key not in node.Properties:
-                                flag = False
-                            else:
-                                if node.Properties[key] != value:
-                                    flag = False
-                        if flag:
-                            nodes_to_return.append(node)
-            elif type(condition) is list:
-                for node in self.NodeDictionary.values():
-                    if node.Node_class == class_name:
-                        for c in condition:
-                            flag = True
-                            for key, value in c.items():
-                                if key not in node.Properties:
-                                    flag = False
-                                else:
-                                    if node.Properties[key] != value:
-                                        flag = False
-                            if flag:
-                                nodes_to_return.append(node)
-            return nodes_to_return
+            return [self.NodeDictionary[node_id] for node_id in self.Class2Nodes.get(class_name, ())]
+        return [self.NodeDictionary[node_id] for node_id in self._match_ids(self.Class2Nodes, self.NodePropertyIndex, [class_name], condition)]
     def get_nodes_by_HUB(self, condition=None)->List[Node]:
         """Retournez les Hubs avec telles conditions. Les conditions AND sont en dictionnaire, tandis que les conditions OR sont en liste"""
         if not condition:
             return [node for node in self.NodeDictionary.values() if node.HUB]
-        else:
-            nodes_to_return = []
-            if type(condition) is dict:
-                for node in self.NodeDictionary.values():
-                    if node.HUB:
-                        flag = True
-                        for key, value in condition.items():
-                            if key not in node.Properties:
-                                flag = False
-                            else:
-                                if node.Properties[key] != value:
-                                    flag = False
-                        if flag:
-                            nodes_to_return.append(node)
-            elif type(condition) is list:
-                for node in self.NodeDictionary.values():
-                    if node.HUB:
-                        for c in condition:
-                            flag = True
-                            for key, value in c.items():
-                                if key not in node.Properties:
-                                    flag = False
-                                else:
-                                    if node.Properties[key] != value:
-                                        flag = False
-                            if flag:
-                                nodes_to_return.append(node)
-            return nodes_to_return
+        return [node for node in self.get_all_nodes(condition) if node.HUB]
     def get_all_nodes(self, condition=None):
         """Retounrez tous les Node avec telles conditions. Les conditions AND sont en dictionnaire, tandis que les conditions OR sont en liste"""
         if not condition:
             return list(self.NodeDictionary.values())
-        else:
-            nodes_to_return = []
-            if type(condition) is dict:
-                for node in self.NodeDictionary.values():
-                    flag = True
-                    for key, value in condition.items():
-                        if key not in node.Properties:
-                            flag = False
-                        else:
-                            if node.Properties[key] != value:
-                                flag = False
-                    if flag:
-                        nodes_to_return.append(node)
-            elif type(condition) is list:
-                for node in self.NodeDictionary.values():
-                    for c in condition:
-                        flag = True
-                        for key, value in c.items():
-                            if key not in node.Properties:
-                                flag = False
-                            else:
-                                if node.Properties[key] != value:
-                                    flag = False
-                        if flag:
-                            nodes_to_return.append(node)
-            return nodes_to_return
+        return [self.NodeDictionary[node_id] for node_id in self._match_ids(self.Class2Nodes, self.NodePropertyIndex, list(self.Class2Nodes), condition)]
+    def get_edges_by_nodes_ids(self, source_id:str, target_id:str, edge_class_name:str=None)->List[Edge]:
+        """Retournez toutes les Edge (parallèles comprises) de tel nœud source vers tel nœud cible, éventuellement de telle classe."""
+        if edge_class_name is None:
+            return [self.EdgeDictionary[edge_id] for edge_id in self.NodePair2Edges.get((source_id, target_id), ())]
+        return [self.EdgeDictionary[edge_id] for edge_id in self._compact_index_ids(self.NodePairClass2Edges, (source_id, target_id, edge_class_name))]
+    def get_edges_by_nodes_names(self, source_name:str, target_name:str, edge_class_name:str=None)->List[Edge]:
+        """Retournez toutes les Edge entre les nœuds nommés `source_name` et `target_name`, homonymes compris."""
+        founded_edges = []
+        for source_node in self.Name2Nodes.get(source_name, ()):
+            for target_node in self.Name2Nodes.get(target_name, ()):
+                founded_edges += self.get_edges_by_nodes_ids(source_node.Id, target_node.Id, edge_class_name)
+        return founded_edges
     def get_edge_by_nodes_names(self, source_name:str, target_name:str)->Edge:
         """Retounez l'edge selon les noms source et cible."""
-        if (source_name, target_name) not in self.SourceTargetNames2Edge:
-            raise ValueError(f"L'arête recherchée entre {source_name} et {target_name}ne figure pas dans la base de données.")
-        return self.SourceTargetNames2Edge[(source_name, target_name)]
+        founded_edges = self.get_edges_by_nodes_names(source_name, target_name)
+        if not founded_edges:
+            raise ValueError(f"L'arête recherchée entre {source_name} et {target_name} ne figure pas dans la base de données.")
+        return founded_edges[0]
     def get_edges_by_class(self, edge_class_name:str, condition=None)->List[Edge]:
         """Retounrez les Edge de telle classe avec telles conditions. Les conditions AND sont en dictionnaire, tandis que les conditions OR sont en liste"""
         if not condition:
-            return [edge for edge in self.EdgeDictionary.values() if edge.Edge_class == edge_class_name]
-        else:
-            edges_to_return = []
-            if type(condition) is dict:
-                for edge in self.EdgeDictionary.values():
-                    if edge.Edge_class == edge_class_name:
-                        flag = True
-                        for key, value in condition.items():
-                            if key not in edge.Properties:
-                                flag = False
-                            else:
-                                if edge.Properties[key] != value:
-                                    flag = False
-                        if flag:
-                            edges_to_return.append(edge)
-
-            elif type(condition) is list:
-                for edge in self.EdgeDictionary.values():
-                    if edge.Edge_class == edge_class_name:
-                        for c in condition:
-                            flag = True
-                            for key, value in c.items():
-                                if key not in edge.Properties:
-                                    flag = False
-                                else:
-                                    if edge.Properties[key] != value:
-                                        flag = False
-                            if flag:
-                                edges_to_return.append(edge)
-            return edges_to_return
-        
+            return [self.EdgeDictionary[edge_id] for edge_id in self.Class2Edges.get(edge_class_name, ())]
+        return [self.EdgeDictionary[edge_id] for edge_id in self._match_ids(self.Class2Edges, self.EdgePropertyIndex, [edge_class_name], condition)]
+
     def get_edge_by_class_and_nodes_names(self, edge_class_name:str, source_name:str, target_name:str)->Edge:
         """Retournez les Edge de telle classe ayant tel nœud source et tel nœud cible."""
-        if (source_name, target_name) not in self.SourceTargetNames2Edge:
+        founded_edges = self.get_edges_by_nodes_names(source_name, target_name, edge_class_name)
+        if not founded_edges:
             raise ValueError(f"L'arête recherchée entre {source_name} et {target_name} ne figure pas dans la base de données.")
-        for edge in self.EdgeDictionary.values():
-            if edge.Edge_class == edge_class_name and self.get_node_by_id(edge.Source_id).Name == source_name and self.get_node_by_id(edge.Target_id).Name == target_name:
-                return edge
+        return founded_edges[0]
     def get_all_edges(self, condition=None):
         """Retournez tous les Edge avec telles conditions. Les conditions AND sont en dictionnaire, tandis que les conditions OR sont en liste"""
         if not condition:
             return list(self.EdgeDictionary.values())
-        else:
-            edges_to_return = []
-            if type(condition) is dict:
-                for edge in self.EdgeDictionary.values():
-                    flag = True
-                    for key, value in condition.items():
-                        if key not in edge.Properties:
-                            flag = False
-                        else:
-                            if edge.Properties[key] != value:
-                                flag = False
-                    if flag:
-                        edges_to_return.append(edge)
-            elif type(condition) is list:
-                for edge in self.EdgeDictionary.values():
-                    for c in condition:
-                        flag = True
-                        for key, value in c.items():
-                            if key not in edge.Properties:
-                                flag = False
-                            else:
-                                if edge.Properties[key] != value:
-                                    flag = False
-                        if flag:
-                            edges_to_return.append(edge)
-            return edges_to_return
+        return [self.EdgeDictionary[edge_id] for edge_id in self._match_ids(self.Class2Edges, self.EdgePropertyIndex, list(self.Class2Edges), condition)]
 
     
     # SETTER ==========================================================================================================
     def update_node(self, node_id:str, key:str, value):
         
-        logger.handlers.clear()
-        logger.addHandler(logging.StreamHandler())
-        
         # Vérifier si le nœud existe
         node = self.NodeDictionary.get(node_id)
         if not node:
             raise ValueError("Le nœud à modifier ne figure pas dans la base de données.")
         
         current_node_name = node.Name
-
-        # Trouver l'index du nœud dans Name2Nodes        
-        current_node_in_Name2Nodes_index = -1
-        for idx, node in enumerate(self.Name2Nodes[current_node_name]):
-            if node.Id == node_id:
-                current_node_in_Name2Nodes_index = idx
         key = key.lower()
+        if self.Journal is not None:
+            self._journal_update(self.update_node, self.NodePropertyIndex, node, node.Node_class, node.Name, key, value)
         
         # Mettre à jour le nom du nœud
+        # Les index d'arêtes sont indexés par ids : seuls Name2Nodes et l'index des préfixes changent
         if key.startswith("name") and isinstance(value, str):
+            if value == current_node_name:
+                return
+            self._unregister_name(node)
             node.Name = value
-            self.Name2Nodes[current_node_name].pop(current_node_in_Name2Nodes_index)
-            self.Name2Nodes[value].append(node)
+            self._register_name(node)
             logger.info(f"Le nom du nœud '{current_node_name}' a été changé en '{value}'.")
-            # Update le node dans les edges
-            edges_to_update = list(self.SourceTargetNames2Edge.keys())
-            for source_name, target_name in edges_to_update:
-                edge = self.SourceTargetNames2Edge.pop((source_name, target_name))
-                if current_node_name in source_name:
-                    self.SourceTargetNames2Edge[(value, target_name)] = edge
-                elif current_node_name in target_name:
-                    self.SourceTargetNames2Edge[(source_name, value)] = edge
 
         # Mettre à jour la classe du nœud
         elif key.startswith("class") and isinstance(value, str):
-            node.node_class = value
-            self.Name2Nodes[current_node_name][current_node_in_Name2Nodes_index].Node_class = value
+            self._unindex_element(self.Class2Nodes, self.NodePropertyIndex, node.Node_class, node_id, node.Properties)
+            node.Node_class = sys.intern(value) if self.Compact else value
+            graph = self._live_snapshot()
+            if graph is not None:
+                graph.add_node(node_id, node.Node_class)
+            self._index_element(self.Class2Nodes, self.NodePropertyIndex, node.Node_class, node_id, node.Properties)
             logger.info(f"La classe du nœud '{current_node_name}' a été changé en '{value}'.")
 
         # Mettre à jour les propriétés du nœud
         elif key.startswith("propert") and isinstance(value, dict):
             for k, v in value.items():
                 old_value = node.Properties.get(k)
+                if k in node.Properties:
+                    self._discard_from_index(self.NodePropertyIndex, (node.Node_class, k, self._index_value(old_value)), node_id)
                 node.Properties[k] = v
+                self.NodePropertyIndex[(node.Node_class, k, self._index_value(v))].add(node_id)
                 if old_value is not None:
                     logger.info(f"La propriété '{k}' de '{current_node_name}' a été changée de '{old_value}' à '{v}'.")
                 else:
@@ -335,109 +1307,548 @@ class OneRingDB:
 
         current_source_name = source_node.Name
         current_target_name = target_node.Name
-
-        # Vérifier si l'arête est enregistrée correctement
-        edge_key = (current_source_name, current_target_name)
-        if edge_key not in self.SourceTargetNames2Edge:
-            raise ValueError("L'arête n'est pas indexée correctement dans SourceTargetNames2Edge.")
+        if self.Journal is not None:
+            self._journal_update(self.update_edge, self.EdgePropertyIndex, edge, edge.Edge_class, (edge.Source_id, edge.Target_id), key, value)
 
         # Mise à jour du nœud source
-        if key.startswith("source") and isinstance(value, str):
+        if key.startswith("source") and isinstance(value, (str, int)):
             new_source_node = self.NodeDictionary.get(value)
             if not new_source_node:
                 raise ValueError("Le nouveau nœud source ne figure pas dans la base de données.")
 
+            # Mettre à jour les arêtes incidentes et les voisins
+            self._detach_edge(edge)
             edge.Source_id = value
-            new_key = (new_source_node.Name, current_target_name)
-
-            # Mettre à jour SourceTargetNames2Edge
-            del self.SourceTargetNames2Edge[edge_key]
-            self.SourceTargetNames2Edge[new_key] = edge
-
-            # Mettre à jour les voisins du target_node
-            target_node.remove_neighbour(source_node.Id)
-            target_node.add_neighbour(value)
+            self._attach_edge(edge)
 
         # Mise à jour du nœud cible
-        elif key.startswith("target") and isinstance(value, str):
+        elif key.startswith("target") and isinstance(value, (str, int)):
             new_target_node = self.NodeDictionary.get(value)
             if not new_target_node:
                 raise ValueError("Le nouveau nœud cible ne figure pas dans la base de données.")
 
+            # Mettre à jour les arêtes incidentes et les voisins
+            self._detach_edge(edge)
             edge.Target_id = value
-            new_key = (current_source_name, new_target_node.Name)
-
-            # Mettre à jour SourceTargetNames2Edge
-            del self.SourceTargetNames2Edge[edge_key]
-            self.SourceTargetNames2Edge[new_key] = edge
-
-            # Mettre à jour les voisins du source_node
-            source_node.remove_neighbour(target_node.Id)
-            source_node.add_neighbour(value)
+            self._attach_edge(edge)
 
         # Mise à jour de la classe de l'arête
         elif key.startswith("class") and isinstance(value, str):
-            edge.Edge_class = value
-            self.SourceTargetNames2Edge[edge_key].Edge_class = value
+            self._unindex_element(self.Class2Edges, self.EdgePropertyIndex, edge.Edge_class, edge_id, edge.Properties)
+            self._discard_from_compact_index(self.NodePairClass2Edges, (edge.Source_id, edge.Target_id, edge.Edge_class), edge_id)
+            edge.Edge_class = sys.intern(value) if self.Compact else value
+            self._add_to_compact_index(self.NodePairClass2Edges, (edge.Source_id, edge.Target_id, edge.Edge_class), edge_id)
+            graph = self._live_snapshot(2)
+            if graph is not None:
+                graph.remove_edge(edge)
+                graph.add_edge(edge)
+            self._index_element(self.Class2Edges, self.EdgePropertyIndex, edge.Edge_class, edge_id, edge.Properties)
             logger.info(f"Classe de l'arête ({current_source_name} -> {current_target_name}) changée en '{value}'.")
 
         # Mise à jour des propriétés de l'arête
         elif key.startswith("propert") and isinstance(value, dict):
             for k, v in value.items():
                 old_value = edge.Properties.get(k)
+                if k in edge.Properties:
+                    self._discard_from_index(self.EdgePropertyIndex, (edge.Edge_class, k, self._index_value(old_value)), edge_id)
                 edge.Properties[k] = v
+                self.EdgePropertyIndex[(edge.Edge_class, k, self._index_value(v))].add(edge_id)
                 if old_value is not None:
                     logger.info(f"Propriété '{k}' de l'arête ({current_source_name} -> {current_target_name}) changée de '{old_value}' à '{v}'.")
                 else:
                     logger.info(f"Propriété '{k}' ajoutée à l'arête ({current_source_name} -> {current_target_name}) avec valeur '{v}'.")
+            self._edge_weights_changed(value)
         else:
             raise ValueError("Il faut indiquer le champ du nœud à modifier entre 'source', 'target', 'class' et 'property'")
-        
+
+    def update_nodes(self, node_ids, properties:dict)->int:
+        """Affectez `properties` à tous les nœuds `node_ids` en un seul passage et retournez leur nombre."""
+        nodes = [self.NodeDictionary.get(node_id) for node_id in node_ids]
+        if any(node is None for node in nodes):
+            raise ValueError("Le nœud à modifier ne figure pas dans la base de données.")
+        self._set_properties(self.NodePropertyIndex, nodes, properties)
+        logger.info(f"Les propriétés {properties} ont été affectées à {len(nodes)} nœuds.")
+        return len(nodes)
+
+    def update_edges(self, edge_ids, properties:dict)->int:
+        """Affectez `properties` à toutes les arêtes `edge_ids` en un seul passage et retournez leur nombre."""
+        edges = [self.EdgeDictionary.get(edge_id) for edge_id in edge_ids]
+        if any(edge is None for edge in edges):
+            raise ValueError("L'arête à modifier ne figure pas dans la base de données.")
+        self._set_properties(self.EdgePropertyIndex, edges, properties)
+        self._edge_weights_changed(properties)
+        logger.info(f"Les propriétés {properties} ont été affectées à {len(edges)} arêtes.")
+        return len(edges)
+
+    def _set_properties(self, property_index, elements:list, properties:dict):
+        """Les ids sont retirés des anciennes entrées de l'index puis ajoutés aux nouvelles par ensembles entiers."""
+        if self.Compact:
+            properties = self._intern_properties(properties)
+        if self.Journal is not None:
+            previous = [(element, dict(element.Properties)) for element in elements]
+            self.Journal.append(lambda: self._restore_properties(property_index, previous))
+        indexed_values = {key:self._index_value(value) for key, value in properties.items()}
+        removed, added = defaultdict(set), defaultdict(OrderedIds)
+        for element in elements:
+            element_class = element.Node_class if isinstance(element, Node) else element.Edge_class
+            element_properties = element.Properties
+            for key, value in properties.items():
+                if key in element_properties:
+                    removed[(element_class, key, self._index_value(element_properties[key]))].add(element.Id)
+                element_properties[key] = value
+                added[(element_class, key, indexed_values[key])].add(element.Id)
+        self._discard_all_from_index(property_index, removed)
+        for index_key, ids in added.items():
+            property_index[index_key] |= ids
+
     # DELETER =========================================================================================================
     def delete_node(self, node_id):
         if node_id not in self.NodeDictionary:
             raise ValueError("Le nœud à supprimer n'existe pas dans la base de données.")
         
         # Supprimer toutes les arêtes associées
-        edges_to_delete = [edge_id for edge_id, edge in self.EdgeDictionary.items() if edge.Source_id == node_id or edge.Target_id == node_id]
+        node = self.NodeDictionary[node_id]
+        edges_to_delete = node.Out_edges | node.In_edges
         for edge_id in edges_to_delete:
             self.delete_edge(edge_id)
 
-        # Supprimer le nœud dans Name2Nodes
-        current_node_name = self.NodeDictionary[node_id].Name        
-        current_node_in_Name2Nodes_index = -1
-        for idx, node in enumerate(self.Name2Nodes[current_node_name]):
-            if node.Id == node_id:
-                current_node_in_Name2Nodes_index = idx
-        self.Name2Nodes[current_node_name].pop(current_node_in_Name2Nodes_index)
+        # Supprimer le nœud dans Name2Nodes et dans l'index des préfixes
+        position = self._unregister_name(node)
+
+        # Supprimer le nœud des index de classes et de propriétés
+        self._unindex_element(self.Class2Nodes, self.NodePropertyIndex, node.Node_class, node_id, node.Properties)
 
         # Supprimer le nœud
         del self.NodeDictionary[node_id]
+        graph = self._live_snapshot()
+        if graph is not None:
+            graph.remove_node(node_id)
+        if self.Journal is not None:
+            self.Journal.append(lambda: self._restore_node(node, position))
     
     def delete_edge(self, edge_id):
         if edge_id not in self.EdgeDictionary:
             raise ValueError("L'arête à supprimer n'existe pas dans la base de données.")
         
         edge = self.EdgeDictionary[edge_id]
-        self.NodeDictionary[edge.Source_id].remove_neighbour(edge.Target_id)
-        self.NodeDictionary[edge.Target_id].remove_neighbour(edge.Source_id)
         del self.EdgeDictionary[edge_id]
-        # Supprimer également l'Edge dans SourceTargetNames2Edge
-        del self.SourceTargetNames2Edge[(self.get_node_by_id(edge.Source_id).Name, self.get_node_by_id(edge.Target_id).Name)]
+        self._detach_edge(edge)
+        self._unindex_element(self.Class2Edges, self.EdgePropertyIndex, edge.Edge_class, edge_id, edge.Properties)
+        if self.Journal is not None:
+            self.Journal.append(lambda: self._restore_edge(edge))
+
+    def delete_nodes(self, node_ids)->Tuple[int, int]:
+        """Supprimez un ensemble de nœuds et toutes leurs arêtes en un seul passage.
+        Retournez le nombre de nœuds et d'arêtes supprimés."""
+        nodes = [self.NodeDictionary.get(node_id) for node_id in node_ids]
+        if any(node is None for node in nodes):
+            raise ValueError("Le nœud à supprimer n'existe pas dans la base de données.")
+        incident_edges = set()
+        for node in nodes:
+            incident_edges |= node.Out_edges
+            incident_edges |= node.In_edges
+        nb_edges = self.delete_edges(incident_edges)
+
+        positions = [self._unregister_name(node) for node in nodes]
+        self._unindex_elements(self.Class2Nodes, self.NodePropertyIndex, nodes)
+        for node in nodes:
+            del self.NodeDictionary[node.Id]
+        graph = self._live_snapshot(len(nodes))
+        if graph is not None:
+            for node in nodes:
+                graph.remove_node(node.Id)
+        if self.Journal is not None:
+            self.Journal.append(lambda: self._restore_nodes(nodes, positions))
+        logger.info(f"{len(nodes)} nœuds et {nb_edges} arêtes ont été supprimés.")
+        return len(nodes), nb_edges
+
+    def delete_edges(self, edge_ids)->int:
+        """Supprimez un ensemble d'arêtes en un seul passage et retournez leur nombre."""
+        edges = [self.EdgeDictionary.get(edge_id) for edge_id in edge_ids]
+        if any(edge is None for edge in edges):
+            raise ValueError("L'arête à supprimer n'existe pas dans la base de données.")
+        for edge in edges:
+            del self.EdgeDictionary[edge.Id]
+            self._detach_edge(edge)
+        self._unindex_elements(self.Class2Edges, self.EdgePropertyIndex, edges)
+        if self.Journal is not None:
+            self.Journal.append(lambda: self._restore_edges(edges))
+        return len(edges)
+
+    # TRANSACTION =====================================================================================================
+    def begin(self):
+        """Ouvrez une transaction : jusqu'à commit ou rollback, chaque modification inscrit son inverse dans le journal."""
+        if self.Journal is not None:
+            raise ValueError("Une transaction est déjà ouverte.")
+        self.Journal = []
+    def commit(self)->int:
+        """Validez la transaction et retournez le nombre de modifications journalisées."""
+        if self.Journal is None:
+            raise ValueError("Aucune transaction n'est ouverte.")
+        nb_changes, self.Journal = len(self.Journal), None
+        return nb_changes
+    def rollback(self)->int:
+        """Annulez toutes les modifications de la transaction, de la dernière à la première."""
+        if self.Journal is None:
+            raise ValueError("Aucune transaction n'est ouverte.")
+        journal, self.Journal = self.Journal, None
+        for undo in reversed(journal):
+            undo()
+        return len(journal)
+    def _journal_update(self, update, property_index, element, element_class:str, previous, key:str, value):
+        """Journalisez l'inverse d'un update_node / update_edge avant qu'il ne soit appliqué."""
+        if key.startswith("propert") and isinstance(value, dict):
+            old_properties = dict(element.Properties)
+            self.Journal.append(lambda: self._reset_properties(property_index, element, old_properties))
+        elif key.startswith("class"):
+            self.Journal.append(lambda: update(element.Id, "class", element_class))
+        elif key.startswith("name"):
+            # Le nœud reprendra sa place parmi ses homonymes, comme après une suppression annulée (voir _restore_node)
+            position = next(idx for idx, node in enumerate(self.Name2Nodes[previous]) if node is element)
+            self.Journal.append(lambda: self._restore_name(element, previous, position))
+        elif key.startswith("source"):
+            self.Journal.append(lambda: update(element.Id, "source", previous[0]))
+        elif key.startswith("target"):
+            self.Journal.append(lambda: update(element.Id, "target", previous[1]))
+    def _restore_properties(self, property_index, previous:list):
+        for element, properties in reversed(previous):
+            self._reset_properties(property_index, element, properties)
+    def _reset_properties(self, property_index, element, properties:dict):
+        element_class = element.Node_class if isinstance(element, Node) else element.Edge_class
+        if not isinstance(element, Node):
+            self._edge_weights_changed(set(element.Properties) | set(properties))
+        for key, value in element.Properties.items():
+            self._discard_from_index(property_index, (element_class, key, self._index_value(value)), element.Id)
+        element.Properties.clear()
+        element.Properties.update(properties)
+        for key, value in properties.items():
+            property_index[(element_class, key, self._index_value(value))].add(element.Id)
+    def _restore_node(self, node:Node, position:int=None):
+        self.NodeDictionary[node.Id] = node
+        self._register_name(node, position)
+        self._index_element(self.Class2Nodes, self.NodePropertyIndex, node.Node_class, node.Id, node.Properties)
+        graph = self._live_snapshot()
+        if graph is not None:
+            graph.add_node(node.Id, node.Node_class)
+    def _restore_name(self, node:Node, name:str, position:int):
+        self._unregister_name(node)
+        node.Name = name
+        self._register_name(node, position)
+    def _restore_edge(self, edge:Edge):
+        self.EdgeDictionary[edge.Id] = edge
+        self._index_element(self.Class2Edges, self.EdgePropertyIndex, edge.Edge_class, edge.Id, edge.Properties)
+        self._attach_edge(edge)
+    def _restore_nodes(self, nodes:List[Node], positions:list):
+        # Dans l'ordre inverse de la suppression, pour retrouver la position de chacun parmi ses homonymes
+        for node, position in zip(reversed(nodes), reversed(positions)):
+            self._restore_node(node, position)
+    def _restore_edges(self, edges:List[Edge]):
+        for edge in reversed(edges):
+            self._restore_edge(edge)
         
+    # INSTANTANÉ =====================================================================================================
+    SNAPSHOT_MAGIC = b"ORINGDB1"
+    def save_snapshot(self, path:str):
+        """Écrivez la base dans un fichier binaire : un en-tête JSON puis des tableaux alignés sur 8 octets
+        (enregistrements des nœuds et des arêtes, table de chaînes, adjacence CSR), relus sans copie par open_snapshot."""
+        graph = self.get_adjacency_snapshot(compact=True)
+        strings:Dict[str:int] = {}
+        def ref(string:str)->int:
+            if string not in strings:
+                if "\x00" in string:
+                    raise ValueError(f"La chaîne {string!r} contient un caractère nul et ne peut pas être enregistrée.")
+                strings[string] = len(strings)
+            return strings[string]
+        def properties_ref(properties:dict)->int:
+            # Les propriétés sont enregistrées en JSON ; les dictionnaires identiques partagent la même chaîne
+            return ref(json.dumps(properties, ensure_ascii=False)) if properties else -1
+
+        nodes = [self.NodeDictionary[node_id] for node_id in graph.Node_ids]
+        edges = [self.EdgeDictionary[edge_id] for edge_id in graph.Edge_ids]
+        id_typecode = 'q' if self.Compact else 'i'
+        sections = {
+            "node_ids": array(id_typecode, (node.Id if self.Compact else ref(node.Id) for node in nodes)),
+            "node_names": array('i', (ref(node.Name) for node in nodes)),
+            "node_properties": array('i', (properties_ref(node.Properties) for node in nodes)),
+            "node_hubs": array('b', (node.HUB for node in nodes)),
+            "edge_ids": array(id_typecode, (edge.Id if self.Compact else ref(edge.Id) for edge in edges)),
+            "edge_sources": array('i', (graph.Node_index[edge.Source_id] for edge in edges)),
+            "edge_targets": array('i', (graph.Node_index[edge.Target_id] for edge in edges)),
+            "edge_properties": array('i', (properties_ref(edge.Properties) for edge in edges)),
+            "node_class_names": array('i', (ref(name) for name in graph.Node_class_codes)),
+            "edge_class_names": array('i', (ref(name) for name in graph.Edge_class_codes)),
+        }
+        for name in CSRSnapshot.BUFFERS:
+            sections[name] = getattr(graph, name)
+        sections["strings"] = "\x00".join(strings).encode("utf-8")
+
+        header = {"format": 1, "byteorder": sys.byteorder, "compact": self.Compact,
+                  "next_node_id": self.NextNodeId, "next_edge_id": self.NextEdgeId, "sections": {}}
+        offset = 0
+        for name, data in sections.items():
+            # array, memoryview (instantané déjà projeté) ou bytes
+            buffer = memoryview(data)
+            header["sections"][name] = [offset, buffer.nbytes, buffer.format]
+            offset += buffer.nbytes + (-buffer.nbytes % 8)
+        header_bytes = json.dumps(header).encode("utf-8")
+
+        # Écriture dans un fichier temporaire puis remplacement atomique
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "wb") as f:
+            f.write(self.SNAPSHOT_MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes)
+            f.write(bytes(-(12 + len(header_bytes)) % 8))
+            for data in sections.values():
+                buffer = memoryview(data)
+                f.write(buffer)
+                f.write(bytes(-buffer.nbytes % 8))
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def open_snapshot(cls, path:str)->"OneRingDB":
+        """Ouvrez un fichier écrit par save_snapshot. Le fichier est projeté en mémoire (mmap) : l'adjacence CSR
+        et les classes des nœuds sont lues sans copie, les nœuds et les arêtes sont reconstruits en une passe
+        avec leurs Id d'origine."""
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mapped[:8] != cls.SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} n'est pas un instantané OneRingDB.")
+        header_length = struct.unpack_from("<I", mapped, 8)[0]
+        header = json.loads(mapped[12:12 + header_length])
+        if header["format"] != 1 or header["byteorder"] != sys.byteorder:
+            raise ValueError(f"L'instantané {path} n'est pas lisible sur cette machine.")
+        data_start = 12 + header_length + (-(12 + header_length) % 8)
+        view = memoryview(mapped)
+        def section(name:str):
+            offset, nbytes, typecode = header["sections"][name]
+            return view[data_start + offset:data_start + offset + nbytes].cast(typecode)
+
+        strings = bytes(section("strings")).decode("utf-8").split("\x00")
+        decoded_properties = {}
+        def properties(properties_ref:int):
+            if properties_ref < 0:
+                return None
+            if properties_ref not in decoded_properties:
+                decoded_properties[properties_ref] = json.loads(strings[properties_ref])
+            return dict(decoded_properties[properties_ref])
+
+        base = cls(compact=header["compact"])
+        base.NextNodeId, base.NextEdgeId = header["next_node_id"], header["next_edge_id"]
+        node_class_names = [strings[name_ref] for name_ref in section("node_class_names")]
+        edge_class_names = [strings[name_ref] for name_ref in section("edge_class_names")]
+        if base.Compact:
+            node_ids, edge_ids = section("node_ids").tolist(), section("edge_ids").tolist()
+        else:
+            node_ids = [strings[id_ref] for id_ref in section("node_ids")]
+            edge_ids = [strings[id_ref] for id_ref in section("edge_ids")]
+
+        nodes = [Node(strings[name_ref], node_class_names[class_code], properties(properties_ref), node_id)
+                 for node_id, name_ref, class_code, properties_ref in zip(node_ids, section("node_names"), section("Node_classes"), section("node_properties"))]
+        for node, hub in zip(nodes, section("node_hubs")):
+            node.HUB = bool(hub)
+        base._install_nodes(nodes)
+
+        # Les classes des arêtes sont relues depuis l'adjacence sortante
+        edge_classes = [None] * len(edge_ids)
+        for edge_idx, class_code in zip(section("Out_edges"), section("Out_classes")):
+            edge_classes[edge_idx] = edge_class_names[class_code]
+        base._install_edges([Edge(node_ids[source], node_ids[target], edge_class, properties(properties_ref), edge_id)
+                             for edge_id, source, target, edge_class, properties_ref in zip(edge_ids, section("edge_sources"), section("edge_targets"), edge_classes, section("edge_properties"))])
+
+        base.AdjacencySnapshot = CSRSnapshot.from_buffers(base.TopologyVersion, node_ids, edge_ids, node_class_names, edge_class_names,
+                                                          {name:section(name) for name in CSRSnapshot.BUFFERS})
+        return base
+
+    def get_adjacency_snapshot(self, compact:bool=False)->CSRSnapshot:
+        """Retournez l'instantané CSR du graphe. Les créations et suppressions y sont appliquées en place (voir
+        _live_snapshot) : il n'est reconstruit qu'au-delà de son seuil de modifications, ou avec compact=True
+        s'il en contient."""
+        graph = self.AdjacencySnapshot
+        if graph is None or graph.Version != self.TopologyVersion or (compact and graph.Nb_changes):
+            with self.Snapshot_lock:
+                graph = self.AdjacencySnapshot
+                if graph is None or graph.Version != self.TopologyVersion or (compact and graph.Nb_changes):
+                    graph = self.AdjacencySnapshot = CSRSnapshot(self)
+        return graph
+
     # REPRESENTATEUR ==================================================================================================
     def __str__(self)->str:
         return f"OneRingDB(Nodes={len(self.NodeDictionary)}, Edges={len(self.EdgeDictionary)})"
     
+# Lexèmes ORQL : chaînes entre guillemets, nombres, paramètres $nom, identifiants et ponctuation
+ORQL_TOKEN_PATTERN = re.compile(r'''
+    (?P<SPACE>\s+)
+  | (?P<STRING>"[^"]*")
+  | (?P<NUMBER>-?\d+(?:\.\d+)?(?![\w.-]))
+  | (?P<PARAM>\$\w+)
+  | (?P<IDENT>\w+(?:-\w+)*)
+  | (?P<PUNCT>[()\[\]{}:,=<>.-])
+''', re.VERBOSE)
+
+class ORToken:
+    __slots__ = ("Kind", "Value", "Column")
+
+    def __init__(self, kind:str, value:str, column:int):
+        self.Kind = kind
+        self.Value = value
+        self.Column = column
+
+    def __repr__(self):
+        return f"ORToken({self.Kind}, {self.Value!r}, colonne={self.Column})"
+
+class ORNodePattern:
+    """Motif de nœud de l'AST : (nom:Classe{propriétés}), ou (variable:Classe{propriétés}) dans un MATCH"""
+    __slots__ = ("Name", "Class", "Properties", "Column", "Variable")
+
+    def __init__(self, name:str, node_class:str, properties:dict, column:int, variable:str=None):
+        self.Name = name
+        self.Class = node_class
+        self.Properties = properties
+        self.Column = column
+        self.Variable = variable
+
+class OREdgePattern:
+    """Motif d'arête de l'AST : [source, cible:CLASSE{propriétés}]"""
+    __slots__ = ("Source", "Target", "Class", "Properties", "Column")
+
+    def __init__(self, source:str, target:str, edge_class:str, properties:dict, column:int):
+        self.Source = source
+        self.Target = target
+        self.Class = edge_class
+        self.Properties = properties
+        self.Column = column
+
+class ORRelationshipPattern:
+    """Relation d'un motif MATCH : -[variable:CLASSE{propriétés}]->, <-[...]- ou -[...]-.
+    Direction vaut 'out', 'in' ou 'both', lue de gauche à droite."""
+    __slots__ = ("Variable", "Class", "Properties", "Direction", "Column")
+
+    def __init__(self, variable:str, edge_class:str, properties:dict, direction:str, column:int):
+        self.Variable = variable
+        self.Class = edge_class
+        self.Properties = properties
+        self.Direction = direction
+        self.Column = column
+
+class ORPathPattern:
+    """Motif MATCH : nœuds et relations alternés, Relationships[i] reliant Nodes[i] à Nodes[i + 1].
+    End est la colonne qui suit le motif et son WHERE, avant SKIP et LIMIT."""
+    __slots__ = ("Nodes", "Relationships", "Column", "End")
+
+    def __init__(self, nodes:List[ORNodePattern], relationships:List[ORRelationshipPattern], column:int, end:int=None):
+        self.Nodes = nodes
+        self.Relationships = relationships
+        self.Column = column
+        self.End = end
+
+class ORStatement:
+    """Racine de l'AST d'une ligne ORQL."""
+    __slots__ = ("Command", "Column", "Pattern", "Condition", "Options")
+
+    def __init__(self, command:str, column:int, pattern=None, condition=None, options=None):
+        self.Command = command
+        self.Column = column
+        self.Pattern = pattern
+        self.Condition = condition if condition is not None else {}
+        self.Options = options if options is not None else {}
+
 class ORQueryParser:
-    def __init__(self, query:str, base:OneRingDB):
+    def __init__(self, query:str, base:OneRingDB=None):
+        """Sans `base`, la requête est seulement compilée : voir bind pour résoudre les noms et les paramètres."""
         self.line = query
         self.Command = ""
         self.Id = ""
         self.Class = ""
         self.Properties = {}
         self.Condition = {}
-        self.parseur(base)
+        # Noms des nœuds cités, résolus en Id par bind
+        self.Names = ()
+        # Propriétés entre accolades d'un UPDATE, appliquées à l'exécution
+        self.Update_properties = {}
+        # Arbre syntaxique (ORStatement) produit par parseur
+        self.Ast = None
+        # Vrai si la requête contient des paramètres $nom à remplacer par bind
+        self.Has_params = False
+        # "EXPLAIN" ou "PROFILE" si la requête est précédée de ce mot clé
+        self.Explain = ""
+        # ORDER BY (propriété, décroissant), SKIP et LIMIT d'un READ
+        self.Order_by = None
+        self.Skip = 0
+        self.Limit = None
+        # Propriété de regroupement d'un COUNT ... GROUP BY
+        self.Group_by = None
+        # Motif (ORPathPattern) d'un MATCH, les conditions du WHERE reportées sur ses nœuds et relations
+        self.Match = None
+        # Propriété des arêtes qui donne leur poids, pour un LINK ... WEIGHT
+        self.Weight = None
+        # Classes d'arêtes à suivre (VIA) et classes de nœuds à éviter (AVOID) pendant le parcours d'un LINK
+        self.Via = ()
+        self.Avoid = ()
+        self.parseur()
+        if base is not None:
+            self.__dict__.update(self.bind(base).__dict__)
+
+    @staticmethod
+    def _bind_value(value, params:dict):
+        """Remplacez un paramètre $nom par sa valeur, convertie en chaîne comme les littéraux."""
+        if isinstance(value, str) and value.startswith('$') and value[1:].isidentifier():
+            if not params or value[1:] not in params:
+                raise ValueError(f"Le paramètre {value} n'a pas de valeur.")
+            return str(params[value[1:]])
+        return value
+
+    def _bind_properties(self, properties:dict, params:dict)->dict:
+        return {key:self._bind_value(value, params) for key, value in properties.items()}
+
+    def bind_params(self, params:dict=None)->"ORQueryParser":
+        """Retournez une copie de la requête compilée dont les paramètres $nom sont remplacés, sans résoudre les noms."""
+        bound = copy.copy(self)
+        bound.Names = tuple(self._bind_value(name, params) for name in self.Names)
+        if self.Command == "CREATE Node":
+            bound.Id = self._bind_value(self.Id, params)
+        bound.Properties = self._bind_properties(self.Properties, params)
+        bound.Update_properties = self._bind_properties(self.Update_properties, params)
+        if type(self.Condition) is list:
+            bound.Condition = [self._bind_properties(c, params) for c in self.Condition]
+        else:
+            bound.Condition = self._bind_properties(self.Condition, params)
+        if self.Match is not None:
+            nodes = [ORNodePattern(self._bind_value(node.Name, params), node.Class, self._bind_properties(node.Properties, params), node.Column, node.Variable)
+                     for node in self.Match.Nodes]
+            relationships = [ORRelationshipPattern(relationship.Variable, relationship.Class, self._bind_properties(relationship.Properties, params), relationship.Direction, relationship.Column)
+                             for relationship in self.Match.Relationships]
+            bound.Match = ORPathPattern(nodes, relationships, self.Match.Column, self.Match.End)
+        return bound
+
+    def bind(self, base:OneRingDB, params:dict=None)->"ORQueryParser":
+        """Retournez une copie de la requête compilée dont les noms sont résolus dans `base` et les paramètres $nom remplacés.
+        La requête compilée elle-même n'est pas modifiée et peut être réutilisée."""
+        bound = self.bind_params(params)
+
+        # Avec un WHERE, UPDATE et DELETE visent la liste des éléments nommés qui satisfont la condition
+        filtered = self.Condition and self.Command in ("UPDATE Node", "DELETE Node", "UPDATE Edge", "DELETE Edge")
+        if self.Command in ("UPDATE Edge", "DELETE Edge"):
+            # DELETE vise toutes les arêtes parallèles entre les deux nœuds, UPDATE toutes celles de la classe :
+            # avec plusieurs arêtes, la liste de leurs ids est modifiée en un seul passage par _write
+            source_node_name, target_node_name = bound.Names
+            edges = base.get_edges_by_nodes_names(source_node_name, target_node_name, self.Class or None)
+            if not edges:
+                raise ValueError(f"L'arête recherchée entre {source_node_name} et {target_node_name} ne figure pas dans la base de données.")
+            if filtered:
+                bound.Id = [edge.Id for edge in edges if base.satisfies(base.EdgePropertyIndex, edge.Edge_class, edge.Id, bound.Condition)]
+            elif self.Command == "UPDATE Edge" and len(edges) == 1:
+                bound.Id = edges[0].Id
+            else:
+                bound.Id = [edge.Id for edge in edges]
+        elif len(bound.Names) == 1:
+            node = base.get_node_by_name(bound.Names[0])
+            if filtered:
+                bound.Id = [homonym.Id for homonym in base.Name2Nodes[node.Name]
+                            if base.satisfies(base.NodePropertyIndex, homonym.Node_class, homonym.Id, bound.Condition)]
+            else:
+                bound.Id = node.Id
+        elif len(bound.Names) == 2:
+            bound.Id = (base.get_node_by_name(bound.Names[0]).Id, base.get_node_by_name(bound.Names[1]).Id)
+        return bound
     
     def __str__(self):
         representation = ""
@@ -453,454 +1864,533 @@ class ORQueryParser:
             representation += str(self.Condition) + "\n"
         return representation.strip()
 
-    def extraire_elements(self, chaine):
-        """Pour les requêtes sauf celles sur les nœuds."""
-        pattern = r'\[\]|\[[^\]]+\]|"[^"]+"|\w+|='
-        return re.findall(pattern, chaine)
-
-    def extraire_node_query_elements(self, chaine):
-        """Pour les requêtes sur les nœuds."""
-        pattern = r'\(\)|\([^\)]+\)|"[^"]+"|\w+|='
-        return re.findall(pattern, chaine)
-
-    def check_query_line(self, line: str):
-        """Vérifier une ligne de requête"""
-
-        # Vérifier le mot clé
-        line_head = line.split(' ', maxsplit=1)[0]
-        valid_commands = {'UPDATE', 'READ', 'CREATE', 'DELETE', 'LINK', 'COLOR', 'CLUSTER', 'LINEARISE'}
-
-        if line_head not in valid_commands:
-            raise SyntaxError(f"{line} n'a pas une en-tête valable.")
-        
-        # Extraire les éléments de la requête
-        if '(' in line and ')' in line:
-            line_elements = self.extraire_node_query_elements(line)
-        else:
-            line_elements = self.extraire_elements(line)
-        
-        nb_line_elements = len(line_elements)
-
-        # Requête CLUSTER
-        if line_head == "CLUSTER":
-            if nb_line_elements > 2:
-                raise SyntaxError(f"{line} a trop d'éléments.")
-            # Quand 2 éléments, seulement CLUSTER NOT est possible.
-            if nb_line_elements == 2 and line_elements[-1] != 'NOT':
-                raise SyntaxError(f"Utiliser NOT pour ne pas faire le clustering.")
-        # Requête COLOR
-        elif line_head == 'COLOR':
-            if nb_line_elements > 2:
-                raise SyntaxError(f"{line} a trop d'éléments.")
-            # Quand 2 éléments, seulement COLOR NOT est possible.
-            if nb_line_elements == 2 and line_elements[-1] != 'NOT':
-                raise SyntaxError(f"Utiliser NOT pour ne pas faire le coloriage.")
-        # Requête LINEARISE
-        elif line_head == 'LINEARISE':
-            if nb_line_elements > 2:
-                raise SyntaxError(f"{line} a trop d'éléments.")
-            # Quand 2 éléments, seulement LINEARISE NOT est possible.
-            if nb_line_elements == 2 and line_elements[-1] != 'NOT':
-                raise SyntaxError(f"Utiliser NOT pour ne pas faire le linéarisation.")
-        # Requête LINK
-        elif line_head == "LINK":
-            if nb_line_elements > 6:
-                raise SyntaxError(f"{line} a trop d'éléments.")
-
-            if nb_line_elements > 1:
-                nodes_to_look = line_elements[1]
-                if not (nodes_to_look.startswith('[') and nodes_to_look.endswith(']')):
-                    raise SyntaxError(f"{line} manque des crochets.")
-
-                nodes_inner = nodes_to_look[1:-1]
-                try:
-                    first_node, second_node = nodes_inner.split(" ", maxsplit=1)
-                except ValueError:
-                    raise SyntaxError(f"La syntaxe pour représenter les deux nœuds n'est pas correcte.")
-
-                if not first_node.endswith(","):
-                    raise SyntaxError(f"Il faut un espace après le virgule.")
-
-                if not bool(re.match(r'(?:"[^"]*"|\w+|\d+)', second_node)):
-                    raise SyntaxError(f"Il ne faut pas avoir les guillemets au sein des mêmes guillemets.")
-
-            # Quand 3 éléments, seulement ALL est possible
-            if nb_line_elements == 3 and line_elements[2] != "ALL":
-                raise SyntaxError(f"Vous avez oublié le mot-clé 'ALL'.")
-
-            # Quand 4 éléments, seulement MAX_LENGTH ou MIN_LENGTH sont possibles, le 4e élément doit être un nombre
-            if nb_line_elements == 4:
-                if line_elements[2] != "MAX_LENGTH" and line_elements[2] != "MIN_LENGTH":
-                    raise SyntaxError(f"L'erreur de syntaxe dans : {line}")
-                if not line_elements[3].isdigit():
-                    raise SyntaxError(f"L'erreur de syntaxe dans : {line}")
-            # Quand 4 éléments, seulement MAX_LENGTH et MIN_LENGTH sont possibles, le 4e élément doit être un nombre
-            if nb_line_elements == 6:
-                if set(line_elements[2::2]) != set(['MAX_LENGTH', 'MIN_LENGTH']):
-                    raise SyntaxError(f"L'erreur de syntaxe dans : {line}")
-                if not (line_elements[3].isdigit() and line_elements[5].isdigit()):
-                    raise SyntaxError(f"L'erreur de syntaxe dans : {line}")
-        # Requête sur nœuds ou sur arêtes
+    def _error(self, token:"ORToken", reason:str):
+        """Levez une SyntaxError qui indique la colonne (à partir de 1) du lexème fautif."""
+        error = SyntaxError(f"{reason} à la colonne {token.Column} dans : {self.line}")
+        error.offset = token.Column
+        error.text = self.line
+        raise error
+
+    # LEXEUR ==========================================================================================================
+    def tokeniser(self, line:str)->List["ORToken"]:
+        """Découpez la ligne en lexèmes en un seul passage."""
+        tokens = []
+        position = 0
+        while position < len(line):
+            match = ORQL_TOKEN_PATTERN.match(line, position)
+            if match is None:
+                reason = "Guillemet non fermé" if line[position] == '"' else f"Caractère inattendu {line[position]!r}"
+                self._error(ORToken('ERROR', line[position], position + 1), reason)
+            kind = match.lastgroup
+            if kind != 'SPACE':
+                value = match.group()
+                if kind == 'STRING':
+                    value = value[1:-1]
+                tokens.append(ORToken(kind, value, position + 1))
+            position = match.end()
+        tokens.append(ORToken('END', '', len(line) + 1))
+        return tokens
+
+    def _peek(self)->"ORToken":
+        return self.Tokens[self.Position]
+
+    def _advance(self)->"ORToken":
+        token = self.Tokens[self.Position]
+        if token.Kind != 'END':
+            self.Position += 1
+        return token
+
+    def _accept(self, kind:str, value:str=None)->"ORToken":
+        """Consommez le lexème courant s'il est du type (et de la valeur) attendu, sinon retournez None."""
+        token = self.Tokens[self.Position]
+        if token.Kind == kind and (value is None or token.Value == value):
+            return self._advance()
+        return None
+
+    def _expect(self, kind:str, value:str=None, expected:str=None)->"ORToken":
+        token = self._accept(kind, value)
+        if token is None:
+            found = self._peek()
+            expected = expected or (repr(value) if value else kind)
+            self._error(found, f"Attendu : {expected}, trouvé : {found.Value!r}" if found.Kind != 'END' else f"Attendu : {expected}, trouvé : fin de ligne")
+        return token
+
+    # ANALYSEUR =======================================================================================================
+    def _parse_name(self)->str:
+        """Nom de nœud : identifiant, chaîne entre guillemets ou paramètre $nom. Un nom nu peut compter plusieurs mots
+        (Army of the West), lus jusqu'à la ponctuation suivante et gardés tels qu'écrits dans la ligne."""
+        token = self._peek()
+        if token.Kind in ('IDENT', 'NUMBER'):
+            last = self._advance()
+            while self._peek().Kind in ('IDENT', 'NUMBER'):
+                last = self._advance()
+            return self.line[token.Column - 1:last.Column - 1 + len(last.Value)]
+        if token.Kind in ('STRING', 'PARAM'):
+            return self._advance().Value
+        self._error(token, "Nom de nœud attendu")
+
+    def _parse_value(self)->str:
+        """Valeur littérale, toujours conservée en chaîne : les guillemets sont retirés, rien n'est évalué."""
+        token = self._peek()
+        if token.Kind in ('IDENT', 'STRING', 'PARAM', 'NUMBER'):
+            return self._advance().Value
+        self._error(token, "Valeur attendue")
+
+    def _parse_properties(self)->dict:
+        """{Clé:valeur, ...}"""
+        properties = {}
+        if not self._accept('PUNCT', '{'):
+            return properties
+        while True:
+            key = self._expect('IDENT', expected="un nom de propriété").Value
+            self._expect('PUNCT', ':')
+            properties[key] = self._parse_value()
+            if self._accept('PUNCT', '}'):
+                return properties
+            self._expect('PUNCT', ',', expected="',' ou '}'")
+
+    def _parse_class(self)->str:
+        if self._accept('PUNCT', ':'):
+            return self._expect('IDENT', expected="un nom de classe").Value
+        return ""
+
+    def _parse_node_pattern(self)->"ORNodePattern":
+        """( [nom] [:Classe] [{propriétés}] )"""
+        opening = self._expect('PUNCT', '(')
+        name = None
+        if self._peek().Kind != 'PUNCT':
+            name = self._parse_name()
+        pattern = ORNodePattern(name, self._parse_class(), self._parse_properties(), opening.Column)
+        self._expect('PUNCT', ')')
+        return pattern
+
+    def _parse_edge_pattern(self)->"OREdgePattern":
+        """[ [source, cible] [:Classe] [{propriétés}] ]"""
+        opening = self._expect('PUNCT', '[')
+        source = target = None
+        if self._peek().Kind != 'PUNCT':
+            source = self._parse_name()
+            self._expect('PUNCT', ',')
+            target = self._parse_name()
+        pattern = OREdgePattern(source, target, self._parse_class(), self._parse_properties(), opening.Column)
+        self._expect('PUNCT', ']')
+        return pattern
+
+    def _parse_match_node(self)->"ORNodePattern":
+        """( [variable | "nom" | $nom] [:Classe] [{propriétés}] ) : un identifiant est une variable, une chaîne entre
+        guillemets ou un paramètre fixe le nom du nœud."""
+        opening = self._expect('PUNCT', '(')
+        variable = name = None
+        if self._peek().Kind == 'IDENT':
+            variable = self._advance().Value
+        elif self._peek().Kind in ('STRING', 'PARAM'):
+            name = self._advance().Value
+        pattern = ORNodePattern(name, self._parse_class(), self._parse_properties(), opening.Column, variable)
+        self._expect('PUNCT', ')')
+        return pattern
+
+    def _parse_relationship_pattern(self)->"ORRelationshipPattern":
+        """-[variable:CLASSE{propriétés}]->, <-[...]- ou -[...]- ; sans crochets : --> , <-- ou --"""
+        start = self._peek()
+        incoming = self._accept('PUNCT', '<') is not None
+        self._expect('PUNCT', '-')
+        variable, edge_class, properties = None, "", {}
+        if self._accept('PUNCT', '['):
+            if self._peek().Kind == 'IDENT':
+                variable = self._advance().Value
+            edge_class, properties = self._parse_class(), self._parse_properties()
+            self._expect('PUNCT', ']')
+        self._expect('PUNCT', '-')
+        outgoing = self._accept('PUNCT', '>') is not None
+        if incoming and outgoing:
+            self._error(start, "Une relation ne peut pas être orientée dans les deux sens")
+        return ORRelationshipPattern(variable, edge_class, properties, 'in' if incoming else 'out' if outgoing else 'both', start.Column)
+
+    def _parse_match(self, head:"ORToken")->"ORStatement":
+        """MATCH motif [WHERE variable.clé = valeur (AND ...)*] [SKIP n] [LIMIT n]"""
+        nodes, relationships = [self._parse_match_node()], []
+        while self._peek().Value in ('-', '<'):
+            relationships.append(self._parse_relationship_pattern())
+            nodes.append(self._parse_match_node())
+        # Une variable de nœud peut revenir (cycle), une variable de relation non
+        variables = {}
+        for element in nodes + relationships:
+            if element.Variable is None:
+                continue
+            is_node = isinstance(element, ORNodePattern)
+            if element.Variable in variables and not (is_node and variables[element.Variable] is ORNodePattern):
+                self._error(ORToken('IDENT', element.Variable, element.Column), f"La variable {element.Variable} est déjà utilisée")
+            variables[element.Variable] = type(element)
+        if self._accept('IDENT', 'WHERE'):
+            while True:
+                variable = self._expect('IDENT', expected="une variable")
+                if variable.Value not in variables:
+                    self._error(variable, f"Variable inconnue {variable.Value}")
+                self._expect('PUNCT', '.')
+                key = self._expect('IDENT', expected="un nom de propriété").Value
+                self._expect('PUNCT', '=')
+                value = self._parse_value()
+                for element in nodes + relationships:
+                    if element.Variable == variable.Value:
+                        element.Properties[key] = value
+                if self._accept('IDENT', 'AND'):
+                    continue
+                if self._peek().Value == 'OR':
+                    self._error(self._peek(), "MATCH n'accepte que des conditions AND")
+                break
+        end = self._peek().Column
+        options = self._parse_paging()
+        if 'ORDER_BY' in options:
+            self._error(head, "ORDER BY ne s'applique pas à MATCH")
+        return ORStatement('MATCH', head.Column, ORPathPattern(nodes, relationships, nodes[0].Column, end), options=options)
+
+    def _parse_condition(self):
+        """WHERE clé = valeur ((AND|OR) clé = valeur)* : un dictionnaire pour AND, une liste de dictionnaires (forme disjonctive) dès qu'il y a un OR."""
+        if not self._accept('IDENT', 'WHERE'):
+            return {}
+        clauses = [{}]
+        while True:
+            key = self._expect('IDENT', expected="un nom de propriété").Value
+            self._expect('PUNCT', '=')
+            clauses[-1][key] = self._parse_value()
+            if self._accept('IDENT', 'AND'):
+                continue
+            if self._accept('IDENT', 'OR'):
+                clauses.append({})
+                continue
+            break
+        return clauses[0] if len(clauses) == 1 else clauses
+
+    def _parse_link_options(self)->dict:
+        """ALL | MAX_LENGTH n | MIN_LENGTH n | MIN_LENGTH n MAX_LENGTH n (ou WEIGHT propriété, lu par _parse_statement)"""
+        if self._accept('IDENT', 'ALL'):
+            return {'MAX_LENGTH': None, 'MIN_LENGTH': None}
+        options = {}
+        while self._peek().Kind == 'IDENT' and self._peek().Value in ('MAX_LENGTH', 'MIN_LENGTH'):
+            keyword = self._advance()
+            if keyword.Value in options:
+                self._error(keyword, f"{keyword.Value} est déjà donné")
+            length = self._expect('NUMBER', expected="une longueur entière")
+            if not length.Value.isdigit():
+                self._error(length, "La longueur doit être un entier positif")
+            options[keyword.Value] = int(length.Value)
+        if options:
+            options.setdefault('MAX_LENGTH', None)
+            options.setdefault('MIN_LENGTH', None)
+        return options
+
+    def _parse_link_filters(self)->dict:
+        """[VIA :CLASSE(, :CLASSE)*] [AVOID (:Classe)(, (:Classe))*]"""
+        options = {}
+        if self._accept('IDENT', 'VIA'):
+            classes = []
+            while True:
+                self._expect('PUNCT', ':', expected="':' suivi d'une classe d'arête")
+                classes.append(self._expect('IDENT', expected="un nom de classe").Value)
+                if not self._accept('PUNCT', ','):
+                    break
+            options['VIA'] = tuple(classes)
+        if self._accept('IDENT', 'AVOID'):
+            classes = []
+            while True:
+                pattern = self._parse_node_pattern()
+                if pattern.Name is not None or not pattern.Class or pattern.Properties:
+                    self._error(ORToken('PUNCT', '(', pattern.Column), "AVOID attend (:Classe)")
+                classes.append(pattern.Class)
+                if not self._accept('PUNCT', ','):
+                    break
+            options['AVOID'] = tuple(classes)
+        return options
+
+    def _parse_count(self, keyword:str)->int:
+        token = self._expect('NUMBER', expected=f"un entier après {keyword}")
+        if not token.Value.isdigit():
+            self._error(token, f"{keyword} attend un entier positif")
+        return int(token.Value)
+
+    def _parse_paging(self)->dict:
+        """[ORDER BY propriété [ASC|DESC]] [SKIP n] [LIMIT n], dans cet ordre."""
+        options = {}
+        if self._accept('IDENT', 'ORDER'):
+            self._expect('IDENT', 'BY')
+            key = self._expect('IDENT', expected="un nom de propriété").Value
+            descending = self._accept('IDENT', 'DESC') is not None
+            if not descending:
+                self._accept('IDENT', 'ASC')
+            options['ORDER_BY'] = (key, descending)
+        if self._accept('IDENT', 'SKIP'):
+            options['SKIP'] = self._parse_count('SKIP')
+        if self._accept('IDENT', 'LIMIT'):
+            options['LIMIT'] = self._parse_count('LIMIT')
+        return options
+
+    def _parse_statement(self)->"ORStatement":
+        head = self._expect('IDENT', expected="un mot clé")
+        command = head.Value
+        if command in ('CLUSTER', 'COLOR', 'LINEARISE'):
+            negated = self._accept('IDENT', 'NOT') is not None
+            return ORStatement(command + (' NOT' if negated else ''), head.Column)
+        if command in ('BEGIN', 'COMMIT', 'ROLLBACK'):
+            return ORStatement(command, head.Column)
+        if command == 'MATCH':
+            return self._parse_match(head)
+        if command == 'LINK':
+            pattern = self._parse_edge_pattern()
+            if pattern.Source is None or pattern.Class or pattern.Properties:
+                self._error(ORToken('PUNCT', '[', pattern.Column), "LINK attend [source, cible]")
+            # VIA et AVOID se placent avant ou après ALL, MIN_LENGTH et MAX_LENGTH
+            filters = self._parse_link_filters()
+            options = self._parse_link_options()
+            if not filters:
+                filters = self._parse_link_filters()
+            if self._accept('IDENT', 'WEIGHT'):
+                if options:
+                    self._error(head, "WEIGHT ne se combine pas avec ALL, MIN_LENGTH ou MAX_LENGTH")
+                weight = self._expect('IDENT', expected="un nom de propriété").Value
+                return ORStatement(command, head.Column, pattern, options={**filters, 'WEIGHT': weight})
+            paging = self._parse_paging()
+            if 'ORDER_BY' in paging:
+                self._error(head, "ORDER BY ne s'applique pas à LINK")
+            if paging and not options:
+                self._error(head, "SKIP et LIMIT s'appliquent à LINK ALL, MIN_LENGTH ou MAX_LENGTH")
+            return ORStatement(command, head.Column, pattern, options={**filters, **options, **paging})
+        if command not in ('CREATE', 'READ', 'UPDATE', 'DELETE', 'COUNT', 'TOP', 'DEGREE'):
+            self._error(head, f"{command} n'est pas une en-tête valable")
+        options = {}
+        if command == 'TOP':
+            options['LIMIT'] = self._parse_count('TOP')
+            self._expect('IDENT', 'BY')
+            self._expect('IDENT', 'DEGREE')
+
+        if self._peek().Value == '(':
+            pattern = self._parse_node_pattern()
+        elif self._peek().Value == '[':
+            pattern = self._parse_edge_pattern()
         else:
-            
-            if not (('[' in line and ']' in line) or ('(' in line and ')' in line)):
-                raise SyntaxError(f"L'erreur de syntaxe dans : {line}")
-            # Requête sur arêtes
-            if '[' in line and ']' in line:
-                if nb_line_elements == 2:
-                    nodes_to_look = line_elements[1]
-                    if not (nodes_to_look.startswith('[') and nodes_to_look.endswith(']')):
-                        raise SyntaxError(f"L'erreur de syntaxe dans : {line}")
-
-                    inner = nodes_to_look[1:-1]
-                    if line_head == "READ":
-                        return bool(re.fullmatch(r"(|\w+, \w+|:\w+)", inner))
-                    elif line_head == "DELETE":
-                        return bool(re.fullmatch(r"(:\w+|\w+, \w+)", inner))
-                    elif line_head in {"CREATE", "UPDATE"}:
-                        return bool(re.match(r'^\w+, \w+:[\w_]+\{(?:\w+:(?:"[^"]*"|\w+|\d+)(?:,\s*)?)+\}$', inner))
-                    
-
-                elif nb_line_elements > 2 and 'WHERE' in line:
-                    if line_head not in set(["READ", "UPDATE"]):
-                        raise SyntaxError(f"L'erreur de syntaxe dans : {line}")
-                    
-                    if nb_line_elements < 6:
-                        raise SyntaxError(f"L'erreur de syntaxe dans : {line}")
-
-                    if 'AND' in line or 'OR' in line:
-                        if not set(line_elements[4::4]) == set(['=']):
-                            raise SyntaxError(f"L'erreur de syntaxe dans les conditions dans : {line}")
-                    else:
-                        if line_elements[2:5:2] != ['WHERE', '=']:
-                            raise SyntaxError(f"L'erreur de syntaxe dans : {line}")
-
-                    nodes_to_look = line_elements[1]
-                    if not (nodes_to_look.startswith('[') and nodes_to_look.endswith(']')):
-                        raise SyntaxError(f"L'erreur de syntaxe dans : {line}")
-                    if line_head == "READ":
-                        return bool(re.fullmatch(r"|:\w+|\w+, \w+", nodes_to_look[1:-1]))
-                    elif line_head == "UPDATE":
-                        return bool(re.match(r'^\w+, \w+:[\w_]+\{(?:\w+:(?:"[^"]*"|\w+|\d+)(?:,\s*)?)+\}$', nodes_to_look[1:-1]))
-
-                else:
-                    raise SyntaxError(f"L'erreur de syntaxe dans : {line}")
-            # Requête sur nœuds
-            if '(' in line and ')' in line:
-                if nb_line_elements == 2:
-                    nodes_to_look = line_elements[1]
-                    if not (nodes_to_look.startswith('(') and nodes_to_look.endswith(')')):
-                        raise SyntaxError(f"L'erreur de syntaxe dans : {line}")
-                    inner = nodes_to_look[1:-1]
-                    if line_head == "DELETE":
-                        return bool(re.fullmatch(r"\w+", inner))
-                    elif line_head == "READ":
-                        return bool(re.fullmatch(r"(|:?\w+)", inner))
-                    elif line_head == "CREATE":
-                        return bool(re.match(r'^\w+:\w+\{(?:\w+:(?:"[^"]*"|\w+|\d+)(?:,\s*)?)+\}$', inner))
-                    else:
-                        raise SyntaxError(f"L'erreur de syntaxe dans : {line}")
+            self._error(self._peek(), "'(' ou '[' attendu")
+        statement = ORStatement(command, head.Column, pattern, options=options)
+        if command in ('READ', 'UPDATE', 'DELETE', 'COUNT', 'TOP'):
+            statement.Condition = self._parse_condition()
+        if command == 'COUNT' and self._accept('IDENT', 'GROUP'):
+            self._expect('IDENT', 'BY')
+            statement.Options['GROUP_BY'] = self._expect('IDENT', expected="un nom de propriété").Value
+        if command == 'READ':
+            statement.Options = self._parse_paging()
+            if statement.Options and isinstance(pattern, ORNodePattern) and pattern.Name is not None:
+                self._error(ORToken('PUNCT', '(', pattern.Column), "ORDER BY, SKIP et LIMIT ne s'appliquent pas à un nœud unique")
+        self._check_pattern(statement)
+        return statement
+
+    def _check_pattern(self, statement:"ORStatement"):
+        """Vérifiez que le motif convient à la commande."""
+        pattern, command = statement.Pattern, statement.Command
+        where = ORToken('PUNCT', '', pattern.Column)
+        is_node = isinstance(pattern, ORNodePattern)
+        named = pattern.Name is not None if is_node else pattern.Source is not None
+        if command == 'CREATE':
+            if not (named and pattern.Class):
+                self._error(where, "CREATE attend un nom et une classe" if is_node else "CREATE attend [source, cible:CLASSE]")
+        elif command == 'READ':
+            if pattern.Properties or (named and pattern.Class):
+                self._error(where, "READ attend (), (:Classe), (nom), [], [:CLASSE] ou [source, cible]")
+        elif command == 'UPDATE':
+            if not pattern.Properties or (named and not is_node and not pattern.Class):
+                self._error(where, "UPDATE attend (nom{...}), (:Classe{...}), [source, cible:CLASSE{...}] ou [:CLASSE{...}]")
+        elif command == 'DELETE':
+            if pattern.Properties or (named and pattern.Class):
+                self._error(where, "DELETE attend (nom), (:Classe), [source, cible] ou [:CLASSE]")
+        elif command == 'COUNT':
+            if pattern.Properties or named:
+                self._error(where, "COUNT attend (), (:Classe), [] ou [:CLASSE]")
+        elif command == 'TOP':
+            if pattern.Properties or named or not is_node:
+                self._error(where, "TOP k BY DEGREE attend () ou (:Classe)")
+        elif command == 'DEGREE':
+            if pattern.Properties or not named or pattern.Class or not is_node:
+                self._error(where, "DEGREE attend (nom)")
+        # Sans nom ni classe, un UPDATE ou un DELETE viserait toute la base
+        if command in ('UPDATE', 'DELETE') and not named and not pattern.Class and not statement.Condition:
+            self._error(where, f"{command} sur {'tous les nœuds' if is_node else 'toutes les arêtes'} attend une condition WHERE")
+
+    def _set_paging(self, options:dict):
+        self.Order_by = options.get('ORDER_BY')
+        self.Skip = options.get('SKIP', 0)
+        self.Limit = options.get('LIMIT')
+
+    def parseur(self):
+        """Analysez la ligne en un seul passage (lexeur puis descente récursive) et remplissez le plan."""
+        self.Tokens = self.tokeniser(self.line)
+        self.Position = 0
+        self.Has_params = any(token.Kind == 'PARAM' for token in self.Tokens)
+        for keyword in ('EXPLAIN', 'PROFILE'):
+            if self._accept('IDENT', keyword):
+                self.Explain = keyword
+                break
+        statement = self._parse_statement()
+        if self._peek().Kind != 'END':
+            self._error(self._peek(), f"{self._peek().Value!r} inattendu")
+        del self.Tokens, self.Position
+        self.Ast = statement
+
+        command, pattern = statement.Command, statement.Pattern
+        if pattern is None:
+            self.Command = command
+        elif command == 'MATCH':
+            self.Command = command
+            self.Match = pattern
+            self._set_paging(statement.Options)
+        elif command == 'LINK':
+            self.Command = command
+            self.Names = (pattern.Source, pattern.Target)
+            self.Condition = {key: value for key, value in statement.Options.items() if key.endswith('_LENGTH')}
+            self.Weight = statement.Options.get('WEIGHT')
+            self.Via = statement.Options.get('VIA', ())
+            self.Avoid = statement.Options.get('AVOID', ())
+            self._set_paging(statement.Options)
+        elif isinstance(pattern, ORNodePattern):
+            self.Command = command + " Node"
+            if command == 'CREATE':
+                # Id = nom du nœud à créer
+                self.Id = pattern.Name
+                self.Class = pattern.Class
+                self.Properties = pattern.Properties
+            elif command in ('READ', 'COUNT', 'TOP'):
+                self._set_paging(statement.Options)
+                self.Group_by = statement.Options.get('GROUP_BY')
+                if pattern.Class:
+                    self.Command += " CLASS"
+                    self.Class = pattern.Class
+                elif pattern.Name is not None:
+                    self.Command += " SPECIFIC"
+                    self.Names = (pattern.Name,)
                 else:
-                    if line_head == "READ":
-                        if nb_line_elements < 6:
-                            raise SyntaxError(f"L'erreur de syntaxe dans : {line}")
-                        
-                        if 'AND' in line or 'OR' in line:
-                            if not set(line_elements[4::4]) == set(['=']):
-                                raise SyntaxError(f"L'erreur de syntaxe dans les conditions dans : {line}")
-                        else:
-                            if line_elements[2:5:2] != ['WHERE', '=']:
-                                raise SyntaxError(f"L'erreur de syntaxe dans : {line}")
-                        
-                        nodes_to_look = line_elements[1]
-                        if not (nodes_to_look.startswith('(') and nodes_to_look.endswith(')')):
-                            raise SyntaxError(f"L'erreur de syntaxe dans : {line}")
-
-                        return bool(re.fullmatch(r"|:?\w+", nodes_to_look[1:-1]))
-                    elif line_head == "UPDATE":
-                        if nb_line_elements > 2:
-                            if nb_line_elements < 6:
-                                raise SyntaxError(f"L'erreur de syntaxe dans : {line}")
-                            
-                            if 'AND' in line or 'OR' in line:
-                                if not set(line_elements[4::4]) == set(['=']):
-                                    raise SyntaxError(f"L'erreur de syntaxe dans les conditions dans : {line}")
-                            else:
-                                if line_elements[2:5:2] != ['WHERE', '=']:
-                                    raise SyntaxError(f"L'erreur de syntaxe dans : {line}")
-                        nodes_to_look = line_elements[1]
-                        if not (nodes_to_look.startswith('(') and nodes_to_look.endswith(')')):
-                            raise SyntaxError(f"L'erreur de syntaxe dans : {line}")
-                        # (Gandalf{Color:White})
-                        return bool(re.match(r'^\w+(?:\:\w+)?\{(?:\w+:(?:"[^"]*"|\w+|\d+)(?:,\s*)?)+\}$', nodes_to_look[1:-1]))
-        return True
-    
-    def parseur(self, base):
-        """Parse une ligne de requête"""
-        line = self.line
-        if not self.check_query_line(line):
-            raise SyntaxError(f"L'erreur de syntaxe dans : {line}")
-        
-        # Extraie le mot clé
-        line_head = line.split(' ', maxsplit=1)[0]
-        if line_head == "CLUSTER":
-            line_elements = self.extraire_node_query_elements(line)
-            self.Command = 'CLUSTER'
-            if line_elements[-1] == 'NOT':
-                self.Command += ' NOT'
-            return
-        if line_head == 'COLOR':
-            line_elements = self.extraire_node_query_elements(line)
-            self.Command = 'COLOR'
-            if line_elements[-1] == 'NOT':
-                self.Command += ' NOT'
-            return
-        if line_head == 'LINEARISE':
-            line_elements = self.extraire_node_query_elements(line)
-            self.Command = 'LINEARISE'
-            if line_elements[-1] == 'NOT':
-                self.Command += ' NOT'
-            return
-        # Requête sur Node
-        if '(' in line:
-            line_elements = self.extraire_node_query_elements(line)
-            if line_head == "CREATE":
-                # Command = mot clé + Node
-                self.Command = line_head + " Node"
-                node_name = line_elements[1][1:-1].split(':', maxsplit=1)[0]
-                # Id = Node name
-                self.Id = node_name
-                node_class = line_elements[1][1:-1].split(':', maxsplit=1)[1].split('{', maxsplit=1)[0]
-                # Class = Node class
-                self.Class = node_class
-                node_property_brut = line_elements[1][1:-1][len(node_name)+len(node_class)+1:]
-                
-                node_property = {}
-                for ele in node_property_brut[1:-1].split(', '):
-                    key, value = ele.split(':', maxsplit=1)
-                    try:
-                        node_property[key] = str(eval(value))
-                    except:
-                        node_property[key] = value
-                # Properties = Node property
-                self.Properties = node_property
-            
-            elif line_head == "READ":
-                # Command = mot clé + Node
-                self.Command = line_head + " Node"
-                if line_elements[1] == '()':
-                    # () = ALL pour tous les Node
                     self.Command += " ALL"
-                elif line_elements[1][1:-1].startswith(':'):
-                    # Commence par : = Class
+                self.Condition = statement.Condition
+            elif command == 'DEGREE':
+                self.Names = (pattern.Name,)
+            else:
+                # UPDATE et DELETE : un nœud nommé, ou tous ceux de la classe (ou de la base) qui satisfont le WHERE
+                if pattern.Name is not None:
+                    self.Names = (pattern.Name,)
+                elif pattern.Class:
                     self.Command += " CLASS"
-                    class_name = line_elements[1][1:-1].split(':', maxsplit=1)[1]
-                    self.Class = class_name
+                    self.Class = pattern.Class
                 else:
-                    # Sinon on cherche un Node spécifique
+                    self.Command += " ALL"
+                self.Condition = statement.Condition
+                if command == 'UPDATE':
+                    self.Update_properties = pattern.Properties
+        else:
+            self.Command = command + " Edge"
+            self.Class = pattern.Class
+            if pattern.Source is not None:
+                self.Names = (pattern.Source, pattern.Target)
+            if command == 'CREATE':
+                self.Properties = pattern.Properties
+            elif command in ('READ', 'COUNT'):
+                self._set_paging(statement.Options)
+                self.Group_by = statement.Options.get('GROUP_BY')
+                if pattern.Source is not None:
                     self.Command += " SPECIFIC"
-                    node_name = line_elements[1][1:-1]
-                    self.Id = base.get_node_by_name(node_name).Id
-                condition = {}
-                # S'il y a encore des conditions OR ou AND...
-                if 'WHERE' in line_elements:
-                    # Pour les conditions AND
-                    if 'OR' not in line_elements[5:]:
-                        keys = line_elements[3::4]
-                        values = line_elements[5::4]
-                        for key, value in zip(keys, values):
-                            try:
-                                value_ = str(eval(value))
-                            except:
-                                value_ = value
-                            condition[key] = value_
-                    # Pour les conditions OR
-                    else:
-                        condition = []
-                        conditions = ' '.join(line_elements[3:]).split(' OR ')
-                        for c in conditions:
-                            keys = self.extraire_node_query_elements(c)[0::4]
-                            values = self.extraire_node_query_elements(c)[2::4]
-                            kv = {}
-                            for key, value in zip(keys, values):
-                                try:
-                                    value_ = str(eval(value))
-                                except:
-                                    value_ = value
-                                kv[key] = value_
-                            condition.append(kv)
-
-                self.Condition = condition
-            
-            
-            elif line_head == "UPDATE":
-                node_name = line_elements[1][1:-1].split('{', maxsplit=1)[0].split(':', maxsplit=1)[0]
-                node_property_brut = '{' + line_elements[1][1:-1].split('{', maxsplit=1)[1]
-                node_id = base.get_node_by_name(node_name).Id
-                original_node_property = {}
-                node_property = {}
-                for ele in node_property_brut[1:-1].split(', '):
-                    key, value_brut = ele.split(':', maxsplit=1)
-                    try:
-                        original_node_property[key] = str(eval(value_brut))
-                    except:
-                        original_node_property[key] = value_brut
-                base.update_node(node_id, "Properties", original_node_property)
-
-                if 'WHERE' in line_elements:
-                    keys = line_elements[3::4]
-                    values = line_elements[5::4]
-                    for key, value in zip(keys, values):
-                        try:
-                            value_ = str(eval(value))
-                        except:
-                            value_ = value
-                        node_property[key] = value_
-
-                self.Command = line_head + " Node"
-                self.Id = node_id
-                self.Properties = node_property
-
-            elif line_head == "DELETE":
-                node_name = line_elements[1][1:-1]
-                node_id = base.get_node_by_name(node_name).Id
-                self.Command = line_head + " Node"
-                self.Id = node_id
-        # Pour EDGE
-        elif '[' in line and line_head != 'LINK':
-            line_elements = self.extraire_elements(line)
-            if line_head == "CREATE":
-                source_node_name, target_node_name = line_elements[1].strip("[]").split(':', maxsplit=1)[0].split(', ', maxsplit=1)
-                source_node_id, target_node_id = base.get_node_by_name(source_node_name).Id, base.get_node_by_name(target_node_name).Id
-                edge_class = line_elements[1].strip("[]").split(':', maxsplit=1)[1].split('{', maxsplit=1)[0]
-                edge_property_brut = line_elements[1].strip("[]").split(':', maxsplit=1)[1][len(edge_class):]
-                edge_property = {}
-                for ele in edge_property_brut[1:-1].split(', '):
-                    key, value = ele.split(':', maxsplit=1)
-                    try:
-                        edge_property[key] = str(eval(value))
-                    except:
-                        edge_property[key] = value
-                self.Command = line_head + " Edge"
-                self.Id = (source_node_id, target_node_id)
-                self.Class = edge_class
-                self.Properties = edge_property
-
-            elif line_head == "READ":
-                if line_elements[1] == '[]':
-                    self.Command = line_head + " Edge FIND ALL"
-                elif line_elements[1][1:-1].startswith(':'):
-                    self.Command = line_head + " Edge CLASS"
-                    class_name = line_elements[1][1:-1].split(':', maxsplit=1)[1]
-                    self.Class = class_name
-                else:
-                    self.Command = line_head + " Edge SPECIFIC"
-                    source_name, target_name = line_elements[1][1:-1].split(', ', maxsplit=1)
-                    self.Id = (base.get_node_by_name(source_name).Id, base.get_node_by_name(target_name).Id)
-                condition = {}
-                if 'WHERE' in line_elements:
-                    if 'OR' not in line_elements[5:]:
-                        keys = line_elements[3::4]
-                        values = line_elements[5::4]
-                        for key, value in zip(keys, values):
-                            try:
-                                value_ = str(eval(value))
-                            except:
-                                value_ = value
-                            condition[key] = value_
-                    else:
-                        condition = []
-                        conditions = ' '.join(line_elements[3:]).split(' OR ')
-                        # ['Duration = Temporary', 'Years = 1000']
-                        for c in conditions:
-                            keys = self.extraire_node_query_elements(c)[0::4]
-                            values = self.extraire_node_query_elements(c)[2::4]
-                            kv = {}
-                            for key, value in zip(keys, values):
-                                try:
-                                    value_ = str(eval(value))
-                                except:
-                                    value_ = value
-                                kv[key] = value_
-                            condition.append(kv)
-
-                self.Condition = condition
-            
-            elif line_head == "UPDATE":
-                source_node_name, target_node_name = line_elements[1].strip("[]").split(':', maxsplit=1)[0].split(', ', maxsplit=1)
-                edge_class = line_elements[1].strip("[]").split(':', maxsplit=1)[1].split('{', maxsplit=1)[0] 
-                edge_to_change = base.get_edge_by_class_and_nodes_names(edge_class, source_node_name, target_node_name).Id
-                edge_property_brut = line_elements[1].strip("[]").split(':', maxsplit=1)[1][len(edge_class):]
-                original_edge_property = {}
-                for ele in edge_property_brut[1:-1].split(', '):
-                    key, value = ele.split(':', maxsplit=1)
-                    try:
-                        original_edge_property[key] = str(eval(value))
-                    except:
-                        original_edge_property[key] = value
-                base.update_edge(edge_to_change, 'Properties', original_edge_property)
-
-                edge_property = {}
-                if 'WHERE' in line_elements:
-                    keys = line_elements[3::4]
-                    values = line_elements[5::4]
-                    for key, value in zip(keys, values):
-                        try:
-                            value_ = str(eval(value))
-                        except:
-                            value_ = value
-                        edge_property[key] = value_
-                self.Command = line_head + " Edge"
-                self.Id = edge_to_change
-                self.Properties = edge_property
-
-            elif line_head == "DELETE":
-                self.Command = line_head + " Edge"
-                if not line_elements[1][1:-1].startswith(':'):
-                    source_node_name, target_node_name = line_elements[1].strip("[]").split(', ', maxsplit=1)
-                    edge_to_delete = base.get_edge_by_nodes_names(source_node_name, target_node_name).Id
-                    self.Id = edge_to_delete
+                elif pattern.Class:
+                    self.Command += " CLASS"
                 else:
-                    edges = base.get_edges_by_class(line_elements[1].strip("[]")[1:])
-                    self.Id = [edge.Id for edge in edges]
-
-        # LINK
-        else:
-            self.Command = "LINK"
-            line_elements = self.extraire_elements(line)
-            source, end = line_elements[1][1:-1].split(', ')
-            source = source.strip('""')
-            end = end.strip('""')
-            self.Id = (base.get_node_by_name(source).Id, base.get_node_by_name(end).Id)
-            if len(line_elements) > 2 and len(line_elements) <= 4:
-                if line_elements[2] == "ALL":
-                    self.Condition['MAX_LENGTH'] = None
-                    self.Condition['MIN_LENGTH'] = None
-                elif line_elements[2] == "MAX_LENGTH":
-                    self.Condition['MAX_LENGTH'] = int(line_elements[-1])
-                    self.Condition['MIN_LENGTH'] = None
-                elif line_elements[2] == "MIN_LENGTH":
-                    self.Condition['MIN_LENGTH'] = int(line_elements[-1])
-                    self.Condition['MAX_LENGTH'] = None
-            elif len(line_elements) == 6:
-                if line_elements[2] == "MAX_LENGTH":
-                    self.Condition['MAX_LENGTH'] = int(line_elements[3])
-                    self.Condition['MIN_LENGTH'] = int(line_elements[5])
-                elif line_elements[2] == "MIN_LENGTH":
-                    self.Condition['MIN_LENGTH'] = int(line_elements[3])
-                    self.Condition['MAX_LENGTH'] = int(line_elements[5])
-            
+                    self.Command += " FIND ALL"
+                self.Condition = statement.Condition
+            else:
+                if pattern.Source is None:
+                    self.Command += " CLASS" if pattern.Class else " FIND ALL"
+                self.Condition = statement.Condition
+                if command == 'UPDATE':
+                    self.Update_properties = pattern.Properties
+
+class ORQueryCache:
+    """Cache LRU des requêtes compilées (ORQueryParser non liés), indexé par le texte normalisé de la ligne."""
+    def __init__(self, capacity:int=1024):
+        self.Capacity = capacity
+        self.Plans:OrderedDict = OrderedDict()
+        self.Hits = 0
+        self.Misses = 0
+        # Le cache est partagé entre les fils d'exécution du serveur
+        self.Lock = threading.Lock()
+
+    @staticmethod
+    def normalise(line:str)->str:
+        """Réduisez les espaces hors guillemets à un seul."""
+        return re.sub(r'("[^"]*")|\s+', lambda match: match.group(1) or ' ', line.strip())
+
+    def get(self, line:str)->ORQueryParser:
+        key = self.normalise(line)
+        with self.Lock:
+            plan = self.Plans.get(key)
+            if plan is not None:
+                self.Hits += 1
+                self.Plans.move_to_end(key)
+                return plan
+        # Analyse hors du verrou : deux fils peuvent analyser la même ligne, le second résultat remplace le premier
+        plan = ORQueryParser(key)
+        with self.Lock:
+            self.Misses += 1
+            self.Plans[key] = plan
+            if len(self.Plans) > self.Capacity:
+                self.Plans.popitem(last=False)
+        return plan
+
+class ORPreparedQuery:
+    """Requête ORQL compilée une seule fois ; chaque exécution ne fait que résoudre les noms et les paramètres $nom.
+    Exemple : ORPreparedQuery("READ (:Character) WHERE Species = $species").execute(base, {"species": "Elf"})"""
+    def __init__(self, query:str, executor:"ORQueryExecutor"=None):
+        self.Executor = executor if executor is not None else ORQueryExecutor()
+        self.Plans:List[ORQueryParser] = [self.Executor.Plan_cache.get(line) for line in self.Executor.clean_query(query)]
+
+    def execute(self, base:OneRingDB, params:dict=None, ignore_direction=False)->list:
+        """Exécutez chaque ligne et retournez la liste de leurs résultats."""
+        return [self.Executor.execute_single_query(plan.bind(base, params), base, ignore_direction) for plan in self.Plans]
+
+class ORResult:
+    """Résultat d'une ligne exécutée par execute_queries, indépendant de l'affichage. Value est l'objet retourné par
+    execute_single_query (dictionnaire ou None), Status vaut "success", "warning" ou "error" (Message donne alors
+    l'erreur), Elapsed est en secondes."""
+    __slots__ = ("Line", "Value", "Status", "Message", "Elapsed")
+
+    def __init__(self, line:str, value=None, status:str="success", message:str="", elapsed:float=0.0):
+        self.Line = line
+        self.Value = value
+        self.Status = status
+        self.Message = message
+        self.Elapsed = elapsed
+
+    def to_dict(self)->dict:
+        return {"line": self.Line, "status": self.Status, "message": self.Message, "value": self.Value, "elapsed": self.Elapsed}
+
+    def __repr__(self):
+        return f"ORResult({self.Line!r}, status={self.Status}, {self.Elapsed * 1000:.3f} ms)"
 
 class ORQueryExecutor:
-    def __init__(self, query:str, base:OneRingDB, ignore_direction=False):
-        self.Cleand_query:List[str] = self.clean_query(query)
-        self.execute_queries(base, ignore_direction)
+    # Partagé par toutes les exécutions : une même ligne n'est analysée qu'une fois
+    Plan_cache = ORQueryCache()
+
+    def __init__(self, query:str=None, base:OneRingDB=None, ignore_direction=False, session=None):
+        """`session` reçoit les options d'affichage CLUSTER, COLOR et LINEARISE (tout objet qui accepte
+        session[clé] = valeur, comme st.session_state) ; un dictionnaire par défaut.
+        Avec `base`, la requête est exécutée tout de suite et ses résultats sont dans Results."""
+        self.Cleand_query:List[str] = self.clean_query(query) if query is not None else []
+        self.Session = session if session is not None else {}
+        # Pool de processus (concurrent.futures) qui calcule les LINK ALL ; None pour les calculer sur place
+        self.Path_pool = None
+        self.Results:List[ORResult] = []
+        if base is not None:
+            self.Results = self.execute_queries(base, ignore_direction)
+
+    def prepare(self, query:str)->ORPreparedQuery:
+        return ORPreparedQuery(query, self)
 
     def clean_query(self, query_brut)->List[str]:
         """Nettoyer la requête entière et faire une vérification des mots-clés."""
-        possible_line_heads = set(['--', 'CREATE', 'READ', 'UPDATE', 'DELETE', 'LINK', 'COLOR', 'LINEARISE', 'CLUSTER'])
+        possible_line_heads = set(['--', 'CREATE', 'READ', 'UPDATE', 'DELETE', 'COUNT', 'TOP', 'DEGREE', 'MATCH', 'LINK', 'COLOR', 'LINEARISE', 'CLUSTER', 'EXPLAIN', 'PROFILE', 'BEGIN', 'COMMIT', 'ROLLBACK'])
         only_query_lines = []
         for line in query_brut.split('\n'):
+            line = line.strip()
             if not line:
                 pass
             else:
@@ -911,91 +2401,560 @@ class ORQueryExecutor:
                     only_query_lines.append(line)
         return only_query_lines
     
-    def execute_queries(self, base, ignore_direction=False):
-        """Exécuter chaque ligne itérativement"""
-        for q in self.Cleand_query:
-            parsed_query = ORQueryParser(q, base)
-            return_object = self.execute_single_query(parsed_query, base, ignore_direction)
-            st.success("✅ Requête exécutée avec succès.")
-            if type(return_object) is dict:
-                st.session_state.return_object = return_object
-                for k, v in return_object.items():
-                    st.write(k, v)
-
-    def BFS(self, graph, source, end):
-        """Chercher le plus court chemin entre deux nœuds"""
-        node_status = {node:"white" for node in graph}
-        node_status[source] = "gray"
-
-        paths = {node:[] for node in graph}
-        paths[source].append(source)
-
-        queue = [source]
-
-        while queue:
-            current_node = queue.pop(0)
-
-            for neighbour in graph[current_node]:
-                if node_status[neighbour] == "white":
-                    node_status[neighbour] = "gray"
-                    paths[neighbour] = paths[current_node] + [neighbour]
-                    queue.append(neighbour)
-            node_status[current_node] = "black"
-        
-        return paths[end]
-
-    def find_all_paths(self, graph, source, end, max_length=None, min_length=None):
-        """Trouver tous les chemins entre deux nœuds avec option max_length et min_length"""
-        paths = []
-        queue = [[source]]
-
-        while queue:
-            current_path = queue.pop(0)
-            current_node = current_path[-1]
-
-            if current_node == end:
-                path_length = len(current_path) - 1
-                if (max_length is None or path_length <= max_length) and \
-                (min_length is None or path_length >= min_length):
-                    paths.append(current_path)
-                continue
-
-            if max_length is not None and len(current_path) - 1 >= max_length:
+    @staticmethod
+    def check_transactions(plans:List[ORQueryParser]):
+        """Vérifiez que les blocs BEGIN ... COMMIT/ROLLBACK sont bien formés, avant toute exécution."""
+        opened = False
+        for plan in plans:
+            if plan.Command == "BEGIN":
+                if opened:
+                    raise SyntaxError(f"Les transactions ne peuvent pas être imbriquées : {plan.line}")
+                opened = True
+            elif plan.Command in ("COMMIT", "ROLLBACK"):
+                if not opened:
+                    raise SyntaxError(f"{plan.Command} sans BEGIN : {plan.line}")
+                opened = False
+        if opened:
+            raise SyntaxError("BEGIN sans COMMIT ni ROLLBACK.")
+
+    def execute_queries(self, base, ignore_direction=False)->List[ORResult]:
+        """Exécuter chaque ligne itérativement et retourner un ORResult par ligne. Toutes les lignes sont analysées
+        avant la première exécution. Dans un bloc BEGIN ... COMMIT, les CREATE consécutifs sont regroupés et insérés
+        en un seul lot, et la moindre erreur annule toute la transaction. Une erreur d'exécution arrête le script :
+        la ligne en échec est le dernier ORResult, de statut "error"."""
+        plans = [self.Plan_cache.get(q) for q in self.Cleand_query]
+        self.check_transactions(plans)
+        # CREATE en attente dans la transaction ouverte : nœuds (nom, classe, propriétés), relations, noms des nœuds
+        staged_nodes, staged_edges, staged_names = [], [], set()
+        nb_queries = 0
+        results = []
+        for plan in plans:
+            started = perf_counter()
+            try:
+                if base.Journal is None:
+                    if plan.Command == "BEGIN":
+                        base.begin()
+                        nb_queries = 0
+                        results.append(ORResult(plan.line, elapsed=perf_counter() - started))
+                        continue
+                    return_object = self.execute_single_query(plan.bind(base), base, ignore_direction)
+                    results.append(ORResult(plan.line, return_object, message="✅ Requête exécutée avec succès.", elapsed=perf_counter() - started))
+                    continue
+                if plan.Command in ("CREATE Node", "CREATE Edge") and not plan.Explain:
+                    return_object = None
+                    bound = plan.bind_params() if plan.Has_params else plan
+                    if plan.Command == "CREATE Node":
+                        staged_nodes.append((bound.Id, bound.Class, dict(bound.Properties)))
+                        staged_names.add(bound.Id)
+                    else:
+                        # Les extrémités sont vérifiées à cette ligne, comme hors transaction : dans la base ou
+                        # parmi les nœuds mis en attente avant elle
+                        for name in bound.Names:
+                            if name not in staged_names:
+                                base.get_node_by_name(name)
+                        staged_edges.append((*bound.Names, bound.Class, dict(bound.Properties)))
+                else:
+                    # Toute autre requête voit les CREATE qui la précèdent
+                    if staged_nodes or staged_edges:
+                        base.bulk_create(staged_nodes, staged_edges)
+                        staged_nodes, staged_edges, staged_names = [], [], set()
+                    if plan.Command == "COMMIT":
+                        base.commit()
+                        results.append(ORResult(plan.line, message=f"✅ Transaction validée : {nb_queries} requêtes.", elapsed=perf_counter() - started))
+                        continue
+                    if plan.Command == "ROLLBACK":
+                        base.rollback()
+                        results.append(ORResult(plan.line, status="warning", message=f"Transaction annulée : {nb_queries} requêtes.", elapsed=perf_counter() - started))
+                        continue
+                    return_object = self.execute_single_query(plan.bind(base), base, ignore_direction)
+                results.append(ORResult(plan.line, return_object, elapsed=perf_counter() - started))
+                nb_queries += 1
+            except Exception as error:
+                # Les lignes déjà exécutées hors transaction ont modifié la base : leurs résultats sont rendus avec
+                # celui de la ligne en échec, qui arrête le script
+                message = f"{type(error).__name__} : {error}"
+                if base.Journal is not None:
+                    base.rollback()
+                    message += f" (transaction annulée : {nb_queries} requêtes)"
+                results.append(ORResult(plan.line, status="error", message=message, elapsed=perf_counter() - started))
+                break
+        return results
+
+    def BFS(self, graph:CSRSnapshot, source, end, ignore_direction=False, edge_codes:set=None, avoided_codes:set=None):
+        """Chercher le plus court chemin entre deux nœuds par un parcours en largeur bidirectionnel : à chaque tour,
+        la plus petite des deux frontières avance d'un niveau (successeurs depuis la source, prédécesseurs depuis la
+        cible), et le parcours s'arrête dès qu'elles se rencontrent. Seuls les nœuds atteints ont un parent.
+        edge_codes et avoided_codes restreignent le parcours (voir CSRSnapshot.step)."""
+        source_idx, end_idx = graph.Node_index[source], graph.Node_index[end]
+        if source_idx == end_idx:
+            return [source]
+        endpoints = (source_idx, end_idx)
+        forward_step = graph.step(False, ignore_direction, edge_codes, avoided_codes, endpoints)
+        backward_step = graph.step(True, ignore_direction, edge_codes, avoided_codes, endpoints)
+        forward_parents, backward_parents = {source_idx: source_idx}, {end_idx: end_idx}
+        forward_frontier, backward_frontier = [source_idx], [end_idx]
+        meeting = None
+        while forward_frontier and backward_frontier and meeting is None:
+            if len(forward_frontier) <= len(backward_frontier):
+                forward_frontier, meeting = self._expand_frontier(forward_frontier, forward_step, forward_parents, backward_parents)
+            else:
+                backward_frontier, meeting = self._expand_frontier(backward_frontier, backward_step, backward_parents, forward_parents)
+        if meeting is None:
+            return []
+        path = [meeting]
+        while path[-1] != source_idx:
+            path.append(forward_parents[path[-1]])
+        path.reverse()
+        while path[-1] != end_idx:
+            path.append(backward_parents[path[-1]])
+        return [graph.Node_ids[idx] for idx in path]
+
+    @staticmethod
+    def _expand_frontier(frontier:list, step, parents:dict, other_parents:dict):
+        """Avancez une frontière d'un niveau. Retournez la nouvelle frontière et le premier nœud atteint qui a déjà
+        été atteint depuis l'autre extrémité (None sinon)."""
+        next_frontier = []
+        for idx in frontier:
+            for neighbour in step(idx):
+                if neighbour not in parents:
+                    parents[neighbour] = idx
+                    if neighbour in other_parents:
+                        return next_frontier, neighbour
+                    next_frontier.append(neighbour)
+        return next_frontier, None
+
+    @staticmethod
+    def weighted_path(graph:CSRSnapshot, source, end, weights:array, ignore_direction=False, heuristic=None, edge_codes:set=None,
+                      avoided_codes:set=None)->Tuple[list, float]:
+        """Plus court chemin pondéré par `weights` (voir CSRSnapshot.edge_weights) et son coût, par Dijkstra avec un tas.
+        `heuristic(node_id)` peut donner un minorant du coût restant jusqu'à end : la recherche devient un A*, qui
+        visite moins de nœuds. Elle s'arrête dès que end sort du tas. Retournez ([], inf) sans chemin.
+        edge_codes et avoided_codes restreignent le parcours (voir CSRSnapshot.step)."""
+        source_idx, end_idx = graph.Node_index[source], graph.Node_index[end]
+        estimate = (lambda idx: heuristic(graph.Node_ids[idx])) if heuristic is not None else (lambda idx: 0.0)
+        costs, parents = {source_idx: 0.0}, {source_idx: source_idx}
+        heap = [(estimate(source_idx), 0.0, source_idx)]
+        while heap:
+            _, cost, idx = heapq.heappop(heap)
+            if idx == end_idx:
+                break
+            # Entrée périmée : le nœud a été atteint depuis par un chemin moins coûteux
+            if cost > costs[idx]:
                 continue
-
-            for neighbour in graph.get(current_node, []):
-                if neighbour not in current_path:
-                    new_path = current_path + [neighbour]
-                    queue.append(new_path)
-
-        return paths
-
-
-    def execute_single_query(self, parsed_query:ORQueryParser, base:OneRingDB, ignore_direction=False):
-        """Exécuter une ligne de requête."""
+            for neighbour, position, edge_code in graph.edges_from(idx, ignore_direction):
+                if edge_codes is not None and edge_code not in edge_codes:
+                    continue
+                if avoided_codes and neighbour != end_idx and graph.node_class(neighbour) in avoided_codes:
+                    continue
+                new_cost = cost + weights[position]
+                if new_cost < costs.get(neighbour, float("inf")):
+                    costs[neighbour] = new_cost
+                    parents[neighbour] = idx
+                    heapq.heappush(heap, (new_cost + estimate(neighbour), new_cost, neighbour))
+        else:
+            return [], float("inf")
+        path = [end_idx]
+        while path[-1] != source_idx:
+            path.append(parents[path[-1]])
+        return [graph.Node_ids[idx] for idx in reversed(path)], costs[end_idx]
+
+    def find_all_paths(self, graph:CSRSnapshot, source, end, max_length=None, min_length=None, ignore_direction=False, limit:int=None,
+                       edge_codes:set=None, avoided_codes:set=None):
+        """Trouver tous les chemins entre deux nœuds avec option max_length et min_length (les `limit` premiers au plus)"""
+        return list(islice(self.iter_all_paths(graph, source, end, max_length, min_length, ignore_direction, edge_codes, avoided_codes), limit))
+
+    def iter_all_paths(self, graph:CSRSnapshot, source, end, max_length=None, min_length=None, ignore_direction=False, edge_codes:set=None,
+                       avoided_codes:set=None):
+        """Énumérez paresseusement les chemins simples de source à end, en profondeur d'abord : seul le chemin courant
+        est en mémoire, avec l'ensemble de ses nœuds. Un voisin n'est suivi que si sa distance à end tient dans la
+        longueur qui reste (MAX_LENGTH), ou s'il peut atteindre end quand il n'y a pas de limite. edge_codes et
+        avoided_codes restreignent le parcours (voir CSRSnapshot.step), distances comprises."""
+        source_idx, end_idx = graph.Node_index[source], graph.Node_index[end]
+        if source_idx == end_idx:
+            if not min_length:
+                yield [source]
+            return
+        min_length = min_length or 0
+        if max_length is not None and max_length < min_length:
+            return
+        endpoints = (source_idx, end_idx)
+        distances = self._distances_to(end_idx, max_length, graph.step(True, ignore_direction, edge_codes, avoided_codes, endpoints))
+        if source_idx not in distances:
+            return
+        # Plusieurs arêtes entre deux nœuds ne donnent qu'un chemin
+        forward_step = graph.step(False, ignore_direction, edge_codes, avoided_codes, endpoints)
+        step = lambda idx: dict.fromkeys(forward_step(idx))
+
+        path, on_path = [source_idx], {source_idx}
+        stack = [iter(step(source_idx))]
+        while stack:
+            # Longueur du chemin une fois le prochain voisin ajouté
+            length = len(path)
+            for neighbour in stack[-1]:
+                if neighbour in on_path:
+                    continue
+                distance = distances.get(neighbour)
+                if distance is None or (max_length is not None and length + distance > max_length):
+                    continue
+                if neighbour == end_idx:
+                    if length >= min_length:
+                        yield [graph.Node_ids[idx] for idx in path] + [graph.Node_ids[end_idx]]
+                    continue
+                path.append(neighbour)
+                on_path.add(neighbour)
+                stack.append(iter(step(neighbour)))
+                break
+            else:
+                stack.pop()
+                on_path.discard(path.pop())
+
+    @staticmethod
+    def _distances_to(end_idx:int, max_length:int, backward_step)->Dict[int, int]:
+        """Distance à end de chaque nœud qui peut l'atteindre en au plus max_length arêtes, par un parcours en largeur
+        à rebours (backward_step : voir CSRSnapshot.step). Elle ne tient pas compte des nœuds déjà sur le chemin :
+        c'est une borne inférieure."""
+        distances, frontier, distance = {end_idx: 0}, [end_idx], 0
+        while frontier and (max_length is None or distance < max_length):
+            distance += 1
+            next_frontier = []
+            for idx in frontier:
+                for neighbour in backward_step(idx):
+                    if neighbour not in distances:
+                        distances[neighbour] = distance
+                        next_frontier.append(neighbour)
+            frontier = next_frontier
+        return distances
+
+    def _find_all_paths_in_pool(self, graph:CSRSnapshot, source, end, max_length=None, min_length=None, ignore_direction=False, limit:int=None,
+                                edge_codes:set=None, avoided_codes:set=None):
+        """find_all_paths dans un processus de Path_pool. Chaque tâche n'envoie que les indices des nœuds et les
+        modifications faites en place depuis la construction de l'instantané ; les tableaux CSR ne sont envoyés qu'au
+        processus qui ne les a pas encore, après son refus."""
+        changes = {name: getattr(graph, name) for name in CSRSnapshot.CHANGES} if graph.Nb_changes else None
+        arguments = (graph.Node_index[source], graph.Node_index[end], max_length, min_length, ignore_direction, limit, edge_codes, avoided_codes)
+        paths = self.Path_pool.submit(_find_all_paths_in_worker, graph.Token, graph.Version, len(graph), None, changes, *arguments).result()
+        if paths is None:
+            # Les tableaux d'un instantané ouvert par open_snapshot sont des memoryview du fichier, copiés pour être envoyés
+            buffers = {name: buffer if isinstance(buffer, array) else array(buffer.format, buffer.tobytes())
+                       for name, buffer in ((name, getattr(graph, name)) for name in CSRSnapshot.BUFFERS)}
+            paths = self.Path_pool.submit(_find_all_paths_in_worker, graph.Token, graph.Version, len(graph), buffers, changes, *arguments).result()
+        return [[graph.Node_ids[idx] for idx in path] for path in paths]
+
+    def plan(self, parsed_query:ORQueryParser, base:OneRingDB)->ORPlanStep:
+        """Construisez le plan d'exécution d'une requête liée, sans l'exécuter."""
+        command, condition = parsed_query.Command, parsed_query.Condition
+        if command.startswith(('CLUSTER', 'COLOR', 'LINEARISE')):
+            return ORPlanStep("SessionFlag", command)
+        if command in ('BEGIN', 'COMMIT', 'ROLLBACK'):
+            return ORPlanStep("Transaction", command, len(base.Journal or ()))
+        # Les UPDATE et DELETE ensemblistes trouvent les éléments visés avec le même chemin d'accès que READ
+        set_based = command.startswith(("UPDATE", "DELETE")) and not parsed_query.Names
+        aggregate = command.startswith(("COUNT", "TOP"))
+        if command.startswith("READ") or set_based or aggregate:
+            if "Node" in command:
+                dictionary, class_index, property_index = base.NodeDictionary, base.Class2Nodes, base.NodePropertyIndex
+            else:
+                dictionary, class_index, property_index = base.EdgeDictionary, base.Class2Edges, base.EdgePropertyIndex
+            if 'SPECIFIC' in command:
+                if "Node" in command:
+                    return ORPlanStep("NameLookup", parsed_query.Names[0], len(base.Name2Nodes.get(parsed_query.Names[0], ())))
+                access = ORPlanStep("PairLookup", ", ".join(parsed_query.Names), 0, ids=base.NodePair2Edges.get(parsed_query.Id, ()))
+                access.Estimated_rows = len(access.Ids)
+                return self._plan_paging(parsed_query, access)
+            hubs = 'CLASS' in command and parsed_query.Class == 'Hubs'
+            if condition:
+                classes = [parsed_query.Class] if 'CLASS' in command and not hubs else list(class_index)
+                access = base.plan_match(class_index, property_index, classes, condition)
+            elif 'CLASS' in command and not hubs:
+                class_ids = class_index.get(parsed_query.Class, ())
+                access = ORPlanStep("ClassScan", parsed_query.Class, len(class_ids), ids=class_ids)
+            else:
+                access = ORPlanStep("FullScan", "", len(dictionary), ids=dictionary)
+            if hubs:
+                access = ORPlanStep("HubFilter", "", access.Estimated_rows, [access])
+            if set_based:
+                return ORPlanStep(command.split()[0], f"{command.split()[1]} {parsed_query.Class or ''}".strip(), access.Estimated_rows, [access])
+            if command.startswith("TOP"):
+                return ORPlanStep("TopDegree", f"k={parsed_query.Limit}", min(parsed_query.Limit, access.Estimated_rows), [access])
+            if parsed_query.Group_by:
+                return ORPlanStep("GroupCount", parsed_query.Group_by, 0, [access])
+            if aggregate:
+                # Sans filtre à appliquer, le compte est la taille de l'ensemble de l'index
+                return ORPlanStep("Count", "taille de l'index" if access.Ids is not None else "parcours", 1, [access])
+            return self._plan_paging(parsed_query, access)
+        if command == "LINK":
+            snapshot = base.AdjacencySnapshot
+            if snapshot is None or snapshot.Version != base.TopologyVersion:
+                state = "reconstruction"
+            elif snapshot.Nb_changes:
+                state = f"en cache, {snapshot.Nb_changes} modifications appliquées en place"
+            else:
+                state = "en cache"
+            if condition:
+                paging = f", SKIP {parsed_query.Skip}, LIMIT {parsed_query.Limit}" if parsed_query.Skip or parsed_query.Limit is not None else ""
+                traversal = ORPlanStep("AllPaths", f"{condition}, en profondeur{paging}", parsed_query.Limit or 0)
+            elif parsed_query.Weight:
+                weights = "en cache" if snapshot is not None and parsed_query.Weight in snapshot.Weights else "conversion"
+                traversal = ORPlanStep("Dijkstra", f"poids {parsed_query.Weight}, tableau {weights}")
+            else:
+                traversal = ORPlanStep("BFS", "plus court chemin, bidirectionnel")
+            children = [ORPlanStep("AdjacencySnapshot", state, len(base.NodeDictionary)), traversal]
+            return ORPlanStep("LINK", " -> ".join(parsed_query.Names) + self._describe_link_filters(parsed_query), 0, children)
+        if command == "MATCH":
+            return self._plan_paging(parsed_query, base.plan_pattern(parsed_query.Match.Nodes, parsed_query.Match.Relationships))
+        if command == "DEGREE Node":
+            return ORPlanStep("DegreeCounters", parsed_query.Names[0], 1)
+        # Écritures nommées : un élément, ou la liste des éléments retenus par bind
+        targets = len(parsed_query.Id) if type(parsed_query.Id) is list else 1
+        return ORPlanStep(command, ", ".join(parsed_query.Names) or parsed_query.Class, targets)
+
+    @staticmethod
+    def _describe_link_filters(parsed_query:ORQueryParser)->str:
+        """Texte des clauses VIA et AVOID d'un LINK, vide sans elles."""
+        text = ""
+        if parsed_query.Via:
+            text += " via " + ", ".join(f":{edge_class}" for edge_class in parsed_query.Via)
+        if parsed_query.Avoid:
+            text += " en évitant " + ", ".join(f"(:{node_class})" for node_class in parsed_query.Avoid)
+        return text
+
+    @staticmethod
+    def _plan_paging(parsed_query:ORQueryParser, access:ORPlanStep)->ORPlanStep:
+        """Ajoutez au-dessus du chemin d'accès le tri (TopK quand il y a un LIMIT) puis SKIP/LIMIT."""
+        step, rows = access, access.Estimated_rows
+        window = None if parsed_query.Limit is None else parsed_query.Skip + parsed_query.Limit
+        if parsed_query.Order_by:
+            key, descending = parsed_query.Order_by
+            order = f"{key} {'DESC' if descending else 'ASC'}"
+            if window is not None:
+                rows = min(rows, window)
+                step = ORPlanStep("TopK", f"{order}, k={window}", rows, [step])
+            else:
+                step = ORPlanStep("Sort", order, rows, [step])
+        if parsed_query.Skip or window is not None:
+            rows = max(0, min(rows, window if window is not None else rows) - parsed_query.Skip)
+            step = ORPlanStep("Limit", f"SKIP {parsed_query.Skip}, LIMIT {parsed_query.Limit}", rows, [step])
+        return step
+
+    @staticmethod
+    def _order_key(key:str, descending:bool):
+        """Clé de tri sur une propriété : nombres (même écrits en chaîne) avant textes, éléments sans la propriété en dernier."""
+        missing = (-1, 0) if descending else (2, 0)
+        def order_key(element):
+            value = element.Properties.get(key)
+            if value is None:
+                return missing
+            try:
+                return (0, float(value))
+            except (TypeError, ValueError):
+                return (1, str(value))
+        return order_key
+
+    def _page(self, parsed_query:ORQueryParser, elements, plan:ORPlanStep=None):
+        """Appliquez ORDER BY, SKIP et LIMIT à un flux d'éléments. Sans ORDER BY, le flux reste paresseux et LIMIT
+        arrête la lecture ; avec ORDER BY et LIMIT, un tas ne garde que les SKIP + LIMIT meilleurs éléments.
+        Le flux suit l'ordre d'insertion des index (OrderedIds), et les tris sont stables : les pages ne changent pas
+        d'une exécution à l'autre."""
+        steps = []
+        while plan is not None and plan.Operator in ("Limit", "TopK", "Sort"):
+            steps.append(plan)
+            plan = plan.Children[0]
+        steps.reverse()
+        window = None if parsed_query.Limit is None else parsed_query.Skip + parsed_query.Limit
+        if parsed_query.Order_by:
+            key, descending = parsed_query.Order_by
+            elements = self._sort(elements, self._order_key(key, descending), descending, window)
+            if steps:
+                elements = steps.pop(0).track(elements)
+        if parsed_query.Skip or window is not None:
+            elements = islice(elements, parsed_query.Skip, window)
+            if steps:
+                elements = steps.pop(0).track(elements)
+        return elements
+
+    @staticmethod
+    def _sort(elements, order_key, descending:bool, window:int=None):
+        """Tri différé jusqu'à la première lecture ; avec une fenêtre, tas des `window` meilleurs éléments seulement."""
+        if window is not None:
+            yield from (heapq.nlargest if descending else heapq.nsmallest)(window, elements, key=order_key)
+        else:
+            yield from sorted(elements, key=order_key, reverse=descending)
+
+    def explain(self, parsed_query:ORQueryParser, base:OneRingDB, ignore_direction=False)->dict:
+        """EXPLAIN affiche le plan choisi sans exécuter la requête. PROFILE exécute la requête et mesure
+        les lignes et le temps de chaque opérateur."""
+        plan = self.plan(parsed_query, base)
+        if parsed_query.Explain == "EXPLAIN":
+            return {f"Plan d'exécution de {parsed_query.line} :": plan.describe()}
+        started = perf_counter()
+        return_object = self.execute_single_query(parsed_query, base, ignore_direction, plan)
+        elapsed = perf_counter() - started
+        if plan.Time is None:
+            plan.Time = elapsed
+        if plan.Rows is None and type(return_object) is dict:
+            values = list(return_object.values())
+            if len(values) == 1 and type(values[0]) is list:
+                plan.Rows = len(values[0])
+        profile = {f"Profil de {parsed_query.line} ({elapsed * 1000:.3f} ms au total) :": plan.describe()}
+        return {**return_object, **profile} if type(return_object) is dict else profile
+
+    @staticmethod
+    def _measure(step:ORPlanStep, started:float, rows:int):
+        if step is not None:
+            step.Rows = rows
+            step.Time = perf_counter() - started
+
+    def _read(self, parsed_query:ORQueryParser, base:OneRingDB, dictionary:dict, plan:ORPlanStep=None):
+        """Flux des éléments lus suivant le plan du planificateur, après ORDER BY, SKIP et LIMIT.
+        Un plan fourni par PROFILE mesure chaque opérateur au fil du parcours."""
+        profile = plan is not None
+        if plan is None:
+            plan = self.plan(parsed_query, base)
+        access = plan
+        if access.Operator in ("UPDATE", "DELETE", "Count", "GroupCount", "TopDegree"):
+            access = access.Children[0]
+        while access.Operator in ("Limit", "TopK", "Sort"):
+            access = access.Children[0]
+        hub_filter = access if access.Operator == "HubFilter" else None
+        if hub_filter is not None:
+            access = access.Children[0]
+        elements = (dictionary[element_id] for element_id in base.iter_plan(access, profile))
+        if hub_filter is not None:
+            elements = (node for node in elements if node.HUB)
+            if profile:
+                elements = hub_filter.track(elements)
+        return self._page(parsed_query, elements, plan if profile else None)
+
+    def _write(self, parsed_query:ORQueryParser, base:OneRingDB, plan:ORPlanStep=None)->dict:
+        """UPDATE et DELETE ensemblistes : les éléments visés (liste résolue par bind, ou lus comme par READ)
+        sont modifiés ou supprimés en un seul passage, avec une seule mise à jour groupée des index."""
+        started = perf_counter()
+        is_node = "Node" in parsed_query.Command
+        if parsed_query.Names:
+            ids = parsed_query.Id
+        else:
+            dictionary = base.NodeDictionary if is_node else base.EdgeDictionary
+            ids = [element.Id for element in self._read(parsed_query, base, dictionary, plan)]
+        if parsed_query.Command.startswith("UPDATE"):
+            if is_node:
+                return_object = {"Nombre de nœuds modifiés :": base.update_nodes(ids, parsed_query.Update_properties)}
+            else:
+                return_object = {"Nombre d'arêtes modifiées :": base.update_edges(ids, parsed_query.Update_properties)}
+        elif is_node:
+            nb_nodes, nb_edges = base.delete_nodes(ids)
+            return_object = {"Nombre de nœuds supprimés :": nb_nodes, "Nombre d'arêtes supprimées :": nb_edges}
+        else:
+            return_object = {"Nombre d'arêtes supprimées :": base.delete_edges(ids)}
+        self._measure(plan, started, len(ids))
+        return return_object
+
+    def _aggregate(self, parsed_query:ORQueryParser, base:OneRingDB, plan:ORPlanStep=None)->dict:
+        """COUNT, COUNT ... GROUP BY et TOP k BY DEGREE, évalués par OneRingDB sur les ids du plan, sans construire
+        la liste des éléments."""
+        profile = plan is not None
+        if plan is None:
+            plan = self.plan(parsed_query, base)
+        started = perf_counter()
+        is_node = "Node" in parsed_query.Command
+        dictionary = base.NodeDictionary if is_node else base.EdgeDictionary
+        access = plan.Children[0]
+        if access.Operator == "HubFilter":
+            ids = (node.Id for node in self._read(parsed_query, base, dictionary, plan if profile else None))
+        elif access.Ids is not None and not profile:
+            ids = access.Ids
+        else:
+            ids = base.iter_plan(access, profile)
+
+        scope = ""
+        if parsed_query.Class:
+            scope += f" de la classe {parsed_query.Class}"
+        if parsed_query.Condition:
+            scope += f" avec la condition {parsed_query.Condition}"
+        if parsed_query.Command.startswith("TOP"):
+            top = base.top_by_degree(ids, parsed_query.Limit)
+            self._measure(plan, started, len(top))
+            return {f"Les {parsed_query.Limit} nœuds{scope} de plus haut degré :": [(node.Name, degree) for node, degree in top]}
+        counted = "Nombre de nœuds" if is_node else "Nombre d'arêtes"
+        if parsed_query.Group_by:
+            if is_node:
+                class_index, property_index = base.Class2Nodes, base.NodePropertyIndex
+            else:
+                class_index, property_index = base.Class2Edges, base.EdgePropertyIndex
+            # Sans condition à vérifier, le regroupement peut se lire dans l'index de propriétés
+            if access.Operator == "ClassScan":
+                counts = base.group_count(class_index, property_index, dictionary, [access.Detail], parsed_query.Group_by)
+            elif access.Operator == "FullScan":
+                counts = base.group_count(class_index, property_index, dictionary, list(class_index), parsed_query.Group_by)
+            else:
+                counts = base.group_count(class_index, property_index, dictionary, (), parsed_query.Group_by, ids)
+            self._measure(plan, started, len(counts))
+            return {f"{counted}{scope} par {parsed_query.Group_by} :": dict(counts.most_common())}
+        count = sum(1 for _ in ids) if access.Operator == "HubFilter" else base.count_plan(access)
+        self._measure(plan, started, 1)
+        return {f"{counted}{scope} :": count}
+
+    def _match(self, parsed_query:ORQueryParser, base:OneRingDB, plan:ORPlanStep=None)->dict:
+        """MATCH : les correspondances du motif sont produites paresseusement à partir de l'ancre, donc LIMIT arrête
+        l'extension du motif. Chaque correspondance associe les variables nommées à leur nœud ou à leur arête ;
+        sans variable, elle est le chemin des noms des nœuds."""
+        profile = plan is not None
+        if plan is None:
+            plan = self.plan(parsed_query, base)
+        access = plan
+        while access.Operator == "Limit":
+            access = access.Children[0]
+        nodes, relationships = parsed_query.Match.Nodes, parsed_query.Match.Relationships
+        bindings = self._page(parsed_query, base.iter_pattern(nodes, relationships, access, profile), plan if profile else None)
+        node_variables = {node.Variable: position for position, node in enumerate(nodes) if node.Variable is not None}
+        edge_variables = {relationship.Variable: position for position, relationship in enumerate(relationships) if relationship.Variable is not None}
+        if not node_variables and not edge_variables:
+            matches = [[base.get_node_by_id(node_id).Name for node_id in node_ids] for node_ids, _ in bindings]
+        else:
+            matches = [{**{variable: base.get_node_by_id(node_ids[position]).Name for variable, position in node_variables.items()},
+                        **{variable: str(base.get_edge_by_id(edge_ids[position])) for variable, position in edge_variables.items()}}
+                       for node_ids, edge_ids in bindings]
+        # Comme pour READ, le libellé ne décrit que le motif : SKIP et LIMIT n'y figurent pas
+        pattern = parsed_query.line[parsed_query.Ast.Column - 1 + len('MATCH'):parsed_query.Match.End - 1].strip()
+        return {f"Correspondances du motif {pattern} :": matches}
+
+    def execute_single_query(self, parsed_query:ORQueryParser, base:OneRingDB, ignore_direction=False, plan:ORPlanStep=None):
+        """Exécuter une ligne de requête. `plan` n'est donné que par PROFILE."""
+        if parsed_query.Explain and plan is None:
+            return self.explain(parsed_query, base, ignore_direction)
+        # Transactions, sans regroupement des CREATE hors de execute_queries
+        if parsed_query.Command == 'BEGIN':
+            return base.begin()
+        if parsed_query.Command == 'COMMIT':
+            return base.commit()
+        if parsed_query.Command == 'ROLLBACK':
+            return base.rollback()
+        if parsed_query.Command.startswith(('COUNT', 'TOP')):
+            return self._aggregate(parsed_query, base, plan)
+        if parsed_query.Command == 'MATCH':
+            return self._match(parsed_query, base, plan)
         # Requête CLUSTER
         if parsed_query.Command.startswith('CLUSTER'):
             if 'NOT' in parsed_query.Command:
-                st.session_state.CLUSTER = False
+                self.Session["CLUSTER"] = False
             else:
-                st.session_state.CLUSTER = True
+                self.Session["CLUSTER"] = True
             return
         
         # =============== COLOR ================
         if parsed_query.Command.startswith('COLOR'):
             if 'NOT' in parsed_query.Command:
-                st.session_state.COLOR = False
+                self.Session["COLOR"] = False
             else:
-                st.session_state.COLOR = True
+                self.Session["COLOR"] = True
             return
         # =============== COLOR ================
 
         # =============== LINEARISE ================
         if parsed_query.Command.startswith('LINEARISE'):
             if 'NOT' in parsed_query.Command:
-                st.session_state.LINEARISE = False
+                self.Session["LINEARISE"] = False
             else:
-                st.session_state.LINEARISE = True
+                self.Session["LINEARISE"] = True
             return
         # =============== LINEARISE ================
 
@@ -1008,7 +2967,7 @@ class ORQueryExecutor:
                 if 'CLASS' in parsed_query.Command:
                     # Si on cherche pas de Hubs
                     if parsed_query.Class != 'Hubs':
-                        founded_nodes = base.get_nodes_by_class(parsed_query.Class, parsed_query.Condition)
+                        founded_nodes = self._read(parsed_query, base, base.NodeDictionary, plan)
                         if parsed_query.Condition:
                             # Si les conditions sont conjointes
                             if type(parsed_query.Condition) is dict:
@@ -1020,9 +2979,9 @@ class ORQueryExecutor:
                             return {f"Les nœuds de la classe {parsed_query.Class} sont :" : [node.Name for node in founded_nodes]}
                     else:
                         # Chercher les Hubs
-                        founded_nodes = base.get_nodes_by_HUB(parsed_query.Condition)
+                        founded_nodes = list(self._read(parsed_query, base, base.NodeDictionary, plan))
                         if not founded_nodes:
-                            st.warning("Aucun nœud HUB trouvé. Il est possible que le clustering n'ait pas encore été effectué, ou que vous ayez lancé une requête de recherche de HUBs immédiatement après le clustering. Dans ce cas, veuillez relancer la requête de recherche de HUBs.")
+                            return {"Aucun nœud HUB trouvé. Il est possible que le clustering n'ait pas encore été effectué, ou que vous ayez lancé une requête de recherche de HUBs immédiatement après le clustering. Dans ce cas, veuillez relancer la requête de recherche de HUBs." : []}
                         else:
                             if parsed_query.Condition:
                                 if type(parsed_query.Condition) is dict:
@@ -1034,7 +2993,7 @@ class ORQueryExecutor:
                 elif 'SPECIFIC' in parsed_query.Command:
                     return {f"Les informations du nœud {base.get_node_by_id(parsed_query.Id).Name} :" : str(base.get_node_by_id(parsed_query.Id))}
                 elif 'ALL' in parsed_query.Command:
-                    founded_nodes = base.get_all_nodes(parsed_query.Condition)
+                    founded_nodes = self._read(parsed_query, base, base.NodeDictionary, plan)
                     if parsed_query.Condition:
                         if type(parsed_query.Condition) is dict:
                             return {f"Tous les nœuds avec la condition conjointe {parsed_query.Condition} sont :" : [node.Name for node in founded_nodes]}
@@ -1043,9 +3002,19 @@ class ORQueryExecutor:
                     else:
                         return {f"Tous les nœuds sont :" : [node.Name for node in founded_nodes]}
             elif command == "UPDATE":
-                base.update_node(parsed_query.Id, "Properties", parsed_query.Properties)
+                if type(parsed_query.Id) is not list and parsed_query.Names:
+                    base.update_node(parsed_query.Id, "Properties", parsed_query.Update_properties)
+                else:
+                    return self._write(parsed_query, base, plan)
             elif command == "DELETE":
-                base.delete_node(parsed_query.Id)
+                if type(parsed_query.Id) is not list and parsed_query.Names:
+                    base.delete_node(parsed_query.Id)
+                else:
+                    return self._write(parsed_query, base, plan)
+            elif command == "DEGREE":
+                # Compteurs d'arêtes du nœud : aucune arête n'est lue
+                degrees = {direction: base.get_degree(parsed_query.Id, direction) for direction in ("out", "in", "both")}
+                return {f"Degré du nœud {parsed_query.Names[0]} :": {"sortant": degrees["out"], "entrant": degrees["in"], "total": degrees["both"]}}
         elif "Edge" in parsed_query.Command:
             command = parsed_query.Command.split()[0]
             if command == "CREATE":
@@ -1053,7 +3022,7 @@ class ORQueryExecutor:
                 base.create_edge(source_node_id, target_node_id, parsed_query.Class, parsed_query.Properties)
             elif command == "READ":
                 if 'FIND ALL' in parsed_query.Command:
-                    all_edges = base.get_all_edges(parsed_query.Condition)
+                    all_edges = self._read(parsed_query, base, base.EdgeDictionary, plan)
                     if parsed_query.Condition:
                         if type(parsed_query.Condition) is dict:
                             return {f"Tous les nœuds avec la condition conjointe {parsed_query.Condition} sont :" : [edge.__str__() for edge in all_edges]}
@@ -1063,10 +3032,12 @@ class ORQueryExecutor:
                         return {f"Tous les nœuds sont :" : [edge.__str__() for edge in all_edges]}
                 elif 'SPECIFIC' in parsed_query.Command:
                     source_id, target_id = parsed_query.Id
-                    founded_edge = base.get_edge_by_nodes_names(base.get_node_by_id(source_id).Name, base.get_node_by_id(target_id).Name)
-                    return {f"L'arête entre {base.get_node_by_id(source_id).Name} et {base.get_node_by_id(target_id).Name} est :" : founded_edge.__str__()}
+                    founded_edges = list(self._read(parsed_query, base, base.EdgeDictionary, plan))
+                    if not base.NodePair2Edges.get((source_id, target_id)):
+                        raise ValueError(f"L'arête recherchée entre {base.get_node_by_id(source_id).Name} et {base.get_node_by_id(target_id).Name} ne figure pas dans la base de données.")
+                    return {f"Les arêtes entre {base.get_node_by_id(source_id).Name} et {base.get_node_by_id(target_id).Name} sont :" : [edge.__str__() for edge in founded_edges]}
                 else:
-                    founded_edges = base.get_edges_by_class(parsed_query.Class, parsed_query.Condition)
+                    founded_edges = self._read(parsed_query, base, base.EdgeDictionary, plan)
                     if parsed_query.Condition:
                         if type(parsed_query.Condition) is dict:
                             return {f"Les arêtes trouvées de la classe {parsed_query.Class} avec la condition conjointe {parsed_query.Condition} sont :" : [edge.__str__() for edge in founded_edges]}
@@ -1075,38 +3046,62 @@ class ORQueryExecutor:
                     else:
                         return {f"Les arêtes trouvées de la classe {parsed_query.Class} sont :" : [edge.__str__() for edge in founded_edges]}
             elif command == "UPDATE":
-                base.update_edge(parsed_query.Id, "Properties", parsed_query.Properties)
-            elif command == "DELETE":
-                if type(parsed_query.Id) is not list:
-                    base.delete_edge(parsed_query.Id)
+                if type(parsed_query.Id) is not list and parsed_query.Names:
+                    base.update_edge(parsed_query.Id, "Properties", parsed_query.Update_properties)
                 else:
-                    for edge_id in parsed_query.Id:
-                        base.delete_edge(edge_id)
+                    return self._write(parsed_query, base, plan)
+            elif command == "DELETE":
+                return self._write(parsed_query, base, plan)
         else:
-            all_nodes = base.get_all_nodes()
-
-            if ignore_direction:
-                nodes_to_neighbours = {k.Id:list(k.Neighbours) for k in all_nodes}
-            else:
-                # ========= <DIRECTED GRAPH> =========
-                nodes_to_neighbours = {}
-                for k in all_nodes:
-                    nodes_to_neighbours[k.Id] = []
-                    for neighbour in list(k.Neighbours):
-                        try:
-                            base.get_edge_by_nodes_names(k.Name, base.get_node_by_id(neighbour).Name)
-                            nodes_to_neighbours[k.Id].append(neighbour)
-                        except ValueError:
-                            continue
-                # ========= </DIRECTED GRAPH> =========
+            # Instantané CSR, reconstruit seulement après une modification du graphe
+            started = perf_counter()
+            graph = base.get_adjacency_snapshot()
+            self._measure(plan and plan.Children[0], started, len(graph))
             source, end = parsed_query.Id
+            started = perf_counter()
+            # VIA et AVOID sont traduits en codes de classes de l'instantané, filtrés pendant le parcours
+            edge_codes, avoided_codes = graph.class_codes(parsed_query.Via, parsed_query.Avoid)
+            constraints = self._describe_link_filters(parsed_query)
             if parsed_query.Condition:
-                all_paths_in_id = self.find_all_paths(nodes_to_neighbours, source, end, parsed_query.Condition['MAX_LENGTH'], parsed_query.Condition['MIN_LENGTH'])
+                # Les chemins sont produits à la demande : LIMIT arrête le parcours dès qu'il en a assez
+                window = None if parsed_query.Limit is None else parsed_query.Skip + parsed_query.Limit
+                lengths = (parsed_query.Condition['MAX_LENGTH'], parsed_query.Condition['MIN_LENGTH'], ignore_direction)
+                if self.Path_pool is None:
+                    all_paths_in_id = self.iter_all_paths(graph, source, end, *lengths, edge_codes, avoided_codes)
+                else:
+                    all_paths_in_id = self._find_all_paths_in_pool(graph, source, end, *lengths, window, edge_codes, avoided_codes)
                 all_path = []
-                for nodes in all_paths_in_id:
+                for nodes in islice(all_paths_in_id, parsed_query.Skip, window):
                     all_path.append([])
                     for node_id in nodes:
                         all_path[-1].append(base.get_node_by_id(node_id).Name)
-                return {f"Tous les chemins entre {base.get_node_by_id(source).Name} et {base.get_node_by_id(end).Name} avec la condition {parsed_query.Condition} :" : all_path}
+                self._measure(plan and plan.Children[1], started, len(all_path))
+                return {f"Tous les chemins entre {base.get_node_by_id(source).Name} et {base.get_node_by_id(end).Name}{constraints} avec la condition {parsed_query.Condition} :" : all_path}
+            elif parsed_query.Weight:
+                weights = graph.edge_weights(parsed_query.Weight, base.EdgeDictionary)
+                shortest_path, cost = self.weighted_path(graph, source, end, weights, ignore_direction, None, edge_codes, avoided_codes)
+                self._measure(plan and plan.Children[1], started, len(shortest_path))
+                return {f"Le chemin le plus court pondéré par {parsed_query.Weight} entre {base.get_node_by_id(source).Name} et {base.get_node_by_id(end).Name}{constraints} (coût {cost}) :": [base.get_node_by_id(node).Name for node in shortest_path]}
             else:
-                return {f"Le chemin le plus court entre {base.get_node_by_id(source).Name} et {base.get_node_by_id(end).Name} :": [base.get_node_by_id(node).Name for node in self.BFS(nodes_to_neighbours, source, end)]}
\ No newline at end of file
+                shortest_path = self.BFS(graph, source, end, ignore_direction, edge_codes, avoided_codes)
+                self._measure(plan and plan.Children[1], started, len(shortest_path))
+                return {f"Le chemin le plus court entre {base.get_node_by_id(source).Name} et {base.get_node_by_id(end).Name}{constraints} :": [base.get_node_by_id(node).Name for node in shortest_path]}
+
+# Instantané CSR reçu par un processus du pool de chemins, conservé jusqu'à la reconstruction de l'instantané d'origine
+_worker_graph:CSRSnapshot = None
+
+def _find_all_paths_in_worker(token:str, version:int, nb_nodes:int, buffers:dict, changes:dict, source_idx:int, end_idx:int, max_length=None,
+                               min_length=None, ignore_direction=False, limit:int=None, edge_codes:set=None, avoided_codes:set=None):
+    """Tâche d'un processus du pool de chemins. Les nœuds et les classes y sont désignés par leur indice dans
+    l'instantané et par leur code. Sans `buffers`, retournez None si le processus n'a pas les tableaux de l'instantané
+    `token` : la tâche est alors renvoyée avec eux. Les modifications en place sont reçues à chaque tâche."""
+    global _worker_graph
+    if buffers is not None:
+        _worker_graph = CSRSnapshot.from_buffers(version, range(nb_nodes), [], [], [], buffers, changes)
+        _worker_graph.Token = token
+    elif _worker_graph is None or _worker_graph.Token != token:
+        return None
+    elif _worker_graph.Version != version:
+        _worker_graph.replace_changes(version, nb_nodes, changes)
+    return ORQueryExecutor().find_all_paths(_worker_graph, source_idx, end_idx, max_length, min_length, ignore_direction, limit, edge_codes,
+                                            avoided_codes)